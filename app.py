@@ -1,12 +1,12 @@
 import streamlit as st
 import pandas as pd
-import io
-import plotly.express as px
-import plotly.graph_objects as go
-from pdf_extractor import extract_tables_from_pdf
 from data_processing import process_multiple_tables
 from ratio_analysis import calculate_ratios
-from llm_analysis import get_llm_analysis, format_data_for_llm, list_available_models
+from llm_analysis import stream_llm_analysis, format_compact_data_for_llm, list_available_models, get_cache_stats
+from cache import get_parse_cache, parsed_file_key, frame_fingerprint
+from ingest import load_tables, file_extension, read_csv_normalized, csv_columns, detect_company_column, stack_company_frames
+from perf import PerfRecorder
+from jobs import ExtractionJob
 from utils import validate_financial_data, get_demo_data, custom_metric_card, format_currency
 
 # PAGE CONFIG
@@ -513,6 +513,145 @@ def landing_page():
 
     st.markdown('</div>', unsafe_allow_html=True)
 
+# CACHED PIPELINE STAGES
+# Every widget interaction re-runs this script; these stages are memoized across reruns
+# and sessions, keyed on the data's fingerprint (DataFrame arguments are underscore-
+# prefixed so Streamlit doesn't hash them again). Entries expire and are capped in number
+# so a long-running multi-user server stays bounded.
+STAGE_CACHE_MAX_ENTRIES = 32
+STAGE_CACHE_TTL = 3600  # seconds
+
+@st.cache_data(max_entries=STAGE_CACHE_MAX_ENTRIES, ttl=STAGE_CACHE_TTL, show_spinner=False)
+def cached_ratios(data_key, _df):
+    return calculate_ratios(_df)
+
+@st.cache_data(max_entries=STAGE_CACHE_MAX_ENTRIES, ttl=STAGE_CACHE_TTL, show_spinner=False)
+def cached_llm_payload(data_key, _df):
+    """
+    The compact prompt payload and its size report.
+    """
+    report = {}
+    text = format_compact_data_for_llm(_df, cached_ratios(data_key, _df), report=report)
+    return text, report
+
+@st.cache_data(max_entries=STAGE_CACHE_MAX_ENTRIES, ttl=STAGE_CACHE_TTL, show_spinner=False)
+def growth_figure_spec(data_key, _df):
+    """
+    Revenue/net income chart as a plain figure dict (cheap to cache and to hand to st.plotly_chart).
+    """
+    # plotly is only needed for charts, so it loads on first use rather than at startup
+    import plotly.graph_objects as go
+    fig = go.Figure()
+    fig.add_trace(go.Bar(x=_df.index, y=_df['revenue'], name='Revenue', marker_color='#8b5cf6', opacity=0.85))
+    fig.add_trace(go.Scatter(x=_df.index, y=_df['net_income'], name='Net Income', line=dict(color='#ec4899', width=4), mode='lines+markers'))
+    fig.update_layout(
+        paper_bgcolor='rgba(0,0,0,0)', 
+        plot_bgcolor='rgba(0,0,0,0)', 
+        font=dict(color='#d0d0e0'), 
+        margin=dict(l=0, r=0, t=0, b=0), 
+        legend=dict(orientation="h", yanchor="bottom", y=1.02, xanchor="right", x=1),
+        hovermode='x unified'
+    )
+    return fig.to_dict()
+
+@st.cache_data(max_entries=STAGE_CACHE_MAX_ENTRIES, ttl=STAGE_CACHE_TTL, show_spinner=False)
+def health_figure_spec(data_key, _ratios_df, latest_year):
+    import plotly.graph_objects as go
+    fig_radar = go.Figure()
+    fig_radar.add_trace(go.Scatterpolar(
+        r=[_ratios_df.loc[latest_year, 'Current Ratio']*10, _ratios_df.loc[latest_year, 'ROE (%)'], _ratios_df.loc[latest_year, 'Net Profit Margin'] if 'Net Profit Margin' in _ratios_df.columns else 0], 
+        theta=['Liquidity', 'ROE', 'Margin'], 
+        fill='toself', 
+        marker_color='#8b5cf6',
+        line_color='#ec4899'
+    ))
+    fig_radar.update_layout(
+        polar=dict(bgcolor='rgba(139, 92, 246, 0.05)'), 
+        paper_bgcolor='rgba(0,0,0,0)', 
+        font=dict(color='#d0d0e0'),
+        margin=dict(l=0, r=0, t=0, b=0)
+    )
+    return fig_radar.to_dict()
+
+# BACKGROUND PDF EXTRACTION
+# Seconds between progress polls while a PDF is being parsed in the background
+JOB_POLL_SECONDS = 0.5
+
+@st.fragment(run_every=JOB_POLL_SECONDS)
+def extraction_progress(job):
+    """
+    Progress bar for a running ExtractionJob. Only this fragment re-runs while polling;
+    the whole page re-runs once the job stops, to pick up the result.
+    """
+    if not job.running:
+        st.rerun()
+    if job.cancelling:
+        label = "⏹️ Cancelling..."
+    else:
+        label = f"📄 Parsing page {job.pages_done} of {job.pages_total or '?'} · {job.tables_found} tables found"
+        if job.method == 'text layout':
+            label = f"📝 No ruled tables found, reading the text layout · page {job.pages_done} of {job.pages_total or '?'}"
+    st.progress(job.progress, text=label)
+    line_items = job.line_items
+    if line_items:
+        st.caption(f"🔎 {len(line_items)} line items found so far ({', '.join(line_items)})")
+    if st.button("✖ Cancel parsing", key="cancel_extraction", disabled=job.cancelling):
+        job.cancel()
+
+def pdf_extraction_result(uploaded_file, cache_key, perf):
+    """
+    Drives the background ExtractionJob for an uploaded PDF: starts it on first call,
+    shows its progress (and the line items found so far) while it runs and, once it's
+    done, turns the line items the job merged into a DataFrame. Returns the DataFrame,
+    or None while running, after a cancel or on failure.
+    """
+    job = st.session_state.get('extraction_job')
+    if job is None or job.key != cache_key:
+        if job is not None:
+            job.cancel()
+        job = ExtractionJob(uploaded_file.getvalue(), key=cache_key, layout_fallback=True, parallel=True,
+                            prescreen=True, low_memory=True).start()
+        st.session_state.extraction_job = job
+
+    if job.running:
+        extraction_progress(job)
+        return None
+    if job.status == 'cancelled':
+        st.warning(f"⏹️ Parsing cancelled after {job.pages_done} of {job.pages_total or '?'} pages.")
+        if st.button("🔄 Restart parsing"):
+            del st.session_state.extraction_job
+            st.rerun()
+        return None
+    if job.status == 'failed':
+        st.error(f"❌ Processing failed: {job.error}")
+        return None
+
+    screen_stats = job.stats
+    pages = screen_stats['pages_scanned'] + screen_stats['pages_skipped']
+    # The job normalizes each table as it arrives; that time is reported under normalize
+    normalize_seconds = job.normalize_stats['seconds']
+    perf.record("extract", job.seconds - normalize_seconds, pages=pages, tables=job.tables_found)
+    if job.method == 'text layout':
+        perf.record("layout_fallback", job.fallback_seconds, pages=pages, tables=job.tables_found)
+    # pdfplumber time as reported by the page workers (summed across processes)
+    perf.record("pdfplumber", screen_stats['parse_seconds'] + screen_stats['screen_seconds']
+                + screen_stats['table_seconds'], pages=pages)
+    try:
+        df = job.result()
+        perf.record("normalize", normalize_seconds, tables=job.tables_found, rows=len(df))
+    except Exception as e:
+        st.error(f"❌ Processing failed: {str(e)}")
+        return None
+    if job.method == 'text layout':
+        st.caption(f"📝 No ruled tables were detected; {job.tables_found} statement blocks were read from the "
+                   f"text layout instead ({job.fallback_seconds:.1f}s).")
+    if screen_stats['pages_skipped']:
+        st.caption(f"⏭️ Pre-screen skipped {screen_stats['pages_skipped']} of {pages} pages "
+                   f"(~{max(screen_stats['seconds_saved'], 0):.1f}s saved)")
+    # The parsed frame goes into the parse cache; the job isn't needed any more
+    del st.session_state.extraction_job
+    return df
+
 def analyzer_page():
     st.markdown('<div class="main-content">', unsafe_allow_html=True)
     
@@ -596,32 +735,68 @@ def analyzer_page():
     
     st.markdown('</div>', unsafe_allow_html=True)
 
+    # Per-stage timings for the Performance panel, kept across reruns
+    if 'perf' not in st.session_state:
+        st.session_state.perf = PerfRecorder()
+    perf = st.session_state.perf
+
     df = None
     if demo_mode:
         df = get_demo_data()
         st.toast("🍎 Loading Apple Inc. Financial Data...", icon="✨")
     elif uploaded_file:
-        file_ext = uploaded_file.name.split('.')[-1].lower()
-        with st.spinner("🔄 Processing document..."):
-            try:
-                if file_ext == "pdf":
-                    tables = extract_tables_from_pdf(uploaded_file)
-                    df = process_multiple_tables(tables)
-                elif file_ext == "xlsx":
-                    raw_df = pd.read_excel(uploaded_file)
-                    df = process_multiple_tables([raw_df])
-                elif file_ext == "csv":
-                    raw_df = pd.read_csv(uploaded_file)
-                    df = process_multiple_tables([raw_df])
-            except Exception as e:
-                st.error(f"❌ Processing failed: {str(e)}")
+        file_ext = file_extension(uploaded_file.name)
+        parse_cache = get_parse_cache()
+        cache_key = parsed_file_key(uploaded_file.getvalue())
+        with perf.span("parse_cache", lookups=1) as counts:
+            df = parse_cache.get(cache_key)
+            counts['hits'] = int(df is not None)
+        if df is None:
+            if file_ext == "pdf":
+                df = pdf_extraction_result(uploaded_file, cache_key, perf)
+            elif file_ext == "csv":
+                with st.spinner("🔄 Processing document..."):
+                    try:
+                        # Streamed straight to normalized frames; multi-company exports are
+                        # kept (and cached) stacked under a (company, year) index
+                        with perf.span("load_csv") as counts:
+                            company_col = detect_company_column(csv_columns(uploaded_file))
+                            csv_stats = {}
+                            frames = read_csv_normalized(uploaded_file, company_col=company_col, stats=csv_stats)
+                            df = stack_company_frames(frames)
+                            counts['rows'] = csv_stats['rows_read']
+                            counts['companies'] = len(frames)
+                    except Exception as e:
+                        st.error(f"❌ Processing failed: {str(e)}")
+            else:
+                with st.spinner("🔄 Processing document..."):
+                    try:
+                        with perf.span("load") as counts:
+                            tables = load_tables(uploaded_file, file_ext, excel_options={'parallel': True})
+                            counts['tables'] = len(tables)
+                            counts['rows'] = sum(len(table) for table in tables)
+                        with perf.span("normalize") as counts:
+                            df = process_multiple_tables(tables)
+                            counts['rows'] = len(df)
+                    except Exception as e:
+                        st.error(f"❌ Processing failed: {str(e)}")
+            if df is not None:
+                parse_cache.put(cache_key, df)
+
+    if df is not None and isinstance(df.index, pd.MultiIndex):
+        companies = list(df.index.unique(level=0))
+        company = companies[0]
+        if len(companies) > 1:
+            company = st.selectbox(f"🏢 Company ({len(companies)} in file)", companies, key="company_selector")
+        # Line items other companies have but this one doesn't are all-NaN after stacking
+        df = df.loc[company].dropna(axis=1, how='all').rename_axis(None)
 
     if df is not None:
         valid, msg = validate_financial_data(df)
         if not valid:
             st.error(f"⚠️ {msg}")
         
-        ratios_df = calculate_ratios(df)
+        data_key = frame_fingerprint(df)
         latest_year = str(df.index[-1])
         prev_year = str(df.index[-2]) if len(df) > 1 else None
 
@@ -674,6 +849,10 @@ def analyzer_page():
                 </div>
             """, unsafe_allow_html=True)
             
+            with perf.span("ratios") as counts:
+                ratios_df = cached_ratios(data_key, df)
+                counts['ratios'] = len(ratios_df.columns)
+
             # KPI Cards
             m_col1, m_col2, m_col3, m_col4 = st.columns(4)
             rev = df.loc[latest_year, 'revenue']
@@ -688,39 +867,17 @@ def analyzer_page():
             m_col4.markdown(custom_metric_card("Return on Equity", f"{roe:.1f}%", None, "📈"), unsafe_allow_html=True)
 
             # Charts section
-            c1, c2 = st.columns([1.5, 1])
-            with c1:
-                st.markdown('<h3 style="color: #ffffff; font-weight: 700; margin-bottom: 16px;">📈 Growth Trajectory</h3>', unsafe_allow_html=True)
-                fig = go.Figure()
-                fig.add_trace(go.Bar(x=df.index, y=df['revenue'], name='Revenue', marker_color='#8b5cf6', opacity=0.85))
-                fig.add_trace(go.Scatter(x=df.index, y=df['net_income'], name='Net Income', line=dict(color='#ec4899', width=4), mode='lines+markers'))
-                fig.update_layout(
-                    paper_bgcolor='rgba(0,0,0,0)', 
-                    plot_bgcolor='rgba(0,0,0,0)', 
-                    font=dict(color='#d0d0e0'), 
-                    margin=dict(l=0, r=0, t=0, b=0), 
-                    legend=dict(orientation="h", yanchor="bottom", y=1.02, xanchor="right", x=1),
-                    hovermode='x unified'
-                )
-                st.plotly_chart(fig, use_container_width=True)
-            with c2:
-                st.markdown('<h3 style="color: #ffffff; font-weight: 700; margin-bottom: 16px;">⚖️ Health Matrix</h3>', unsafe_allow_html=True)
-                if 'Current Ratio' in ratios_df.columns:
-                    fig_radar = go.Figure()
-                    fig_radar.add_trace(go.Scatterpolar(
-                        r=[ratios_df.loc[latest_year, 'Current Ratio']*10, ratios_df.loc[latest_year, 'ROE (%)'], ratios_df.loc[latest_year, 'Net Profit Margin'] if 'Net Profit Margin' in ratios_df.columns else 0], 
-                        theta=['Liquidity', 'ROE', 'Margin'], 
-                        fill='toself', 
-                        marker_color='#8b5cf6',
-                        line_color='#ec4899'
-                    ))
-                    fig_radar.update_layout(
-                        polar=dict(bgcolor='rgba(139, 92, 246, 0.05)'), 
-                        paper_bgcolor='rgba(0,0,0,0)', 
-                        font=dict(color='#d0d0e0'),
-                        margin=dict(l=0, r=0, t=0, b=0)
-                    )
-                    st.plotly_chart(fig_radar, use_container_width=True)
+            with perf.span("charts", charts=2):
+                c1, c2 = st.columns([1.5, 1])
+                with c1:
+                    st.markdown('<h3 style="color: #ffffff; font-weight: 700; margin-bottom: 16px;">📈 Growth Trajectory</h3>', unsafe_allow_html=True)
+                    fig = growth_figure_spec(data_key, df)
+                    st.plotly_chart(fig, use_container_width=True)
+                with c2:
+                    st.markdown('<h3 style="color: #ffffff; font-weight: 700; margin-bottom: 16px;">⚖️ Health Matrix</h3>', unsafe_allow_html=True)
+                    if 'Current Ratio' in ratios_df.columns:
+                        fig_radar = health_figure_spec(data_key, ratios_df, latest_year)
+                        st.plotly_chart(fig_radar, use_container_width=True)
             
             # Ratios table
             st.markdown('<h3 style="color: #ffffff; font-weight: 700; margin-top: 32px; margin-bottom: 16px;">📋 Financial Ratios</h3>', unsafe_allow_html=True)
@@ -746,19 +903,15 @@ def analyzer_page():
             if not api_key:
                 st.warning("⚠️ Connect Gemini API Key above to enable AI analysis")
             else:
-                if st.button("🪄 Run Full AI Intelligence Suite", use_container_width=True):
-                    with st.spinner("🔍 Analyzing financial data..."):
-                        data_str = format_data_for_llm(df, ratios_df)
-                        ai_results = get_llm_analysis(api_key, data_str, model_name=model_name)
-                        if "error" in ai_results: 
-                            st.error(f"❌ {ai_results['error']}")
-                        else: 
-                            st.session_state.ai_results = ai_results
-                            st.success("✅ Analysis complete!")
-                
-                if 'ai_results' in st.session_state:
-                    res = st.session_state.ai_results
-                    
+                run_col, refresh_col = st.columns([3, 1])
+                with refresh_col:
+                    refresh_ai = st.toggle("Refresh cache", help="Ignore cached AI answers and ask the model again")
+                    cache_stats = get_cache_stats()
+                    st.caption(f"Cache: {cache_stats['hits']} hits / {cache_stats['misses']} misses")
+                with run_col:
+                    run_ai = st.button("🪄 Run Full AI Intelligence Suite", use_container_width=True)
+                status_box = st.empty()
+                if run_ai or 'ai_results' in st.session_state:
                     # Tabs for different analyses
                     it1, it2, it3 = st.tabs(["✨ Performance", "🚨 Risk Factors", "💪 Investment Thesis"])
                     
@@ -766,21 +919,21 @@ def analyzer_page():
                         st.markdown("""
                             <div style="background: linear-gradient(135deg, rgba(139, 92, 246, 0.1), rgba(168, 85, 247, 0.05)); padding: 28px; border-radius: 16px; border: 1px solid rgba(139, 92, 246, 0.2); backdrop-filter: blur(20px);">
                         """, unsafe_allow_html=True)
-                        st.markdown(res.get('performance', ''))
+                        performance_box = st.empty()
                         st.markdown("</div>", unsafe_allow_html=True)
                     
                     with it2:
                         st.markdown("""
                             <div style="background: linear-gradient(135deg, rgba(239, 68, 68, 0.08), rgba(236, 72, 153, 0.05)); padding: 28px; border-radius: 16px; border: 1px solid rgba(239, 68, 68, 0.2); backdrop-filter: blur(20px);">
                         """, unsafe_allow_html=True)
-                        st.markdown(res.get('red_flags', ''))
+                        red_flags_box = st.empty()
                         st.markdown("</div>", unsafe_allow_html=True)
                     
                     with it3:
                         st.markdown("""
                             <div style="background: linear-gradient(135deg, rgba(34, 197, 94, 0.08), rgba(6, 182, 212, 0.05)); padding: 28px; border-radius: 16px; border: 1px solid rgba(34, 197, 94, 0.2); backdrop-filter: blur(20px);">
                         """, unsafe_allow_html=True)
-                        st.markdown(res.get('strengths', ''))
+                        strengths_box = st.empty()
                         st.markdown("</div>", unsafe_allow_html=True)
                     
                     # Final verdict
@@ -789,8 +942,68 @@ def analyzer_page():
                             <h3 style="color: #ffffff; font-weight: 800; margin: 0 0 12px 0; font-size: 1.2rem;">📋 Final Investment Verdict</h3>
                             <p style="color: #d0d0e0; margin: 0; font-size: 1rem; line-height: 1.7;">
                     """, unsafe_allow_html=True)
-                    st.markdown(res.get('verdict', ''))
+                    verdict_box = st.empty()
                     st.markdown("</p></div>", unsafe_allow_html=True)
+
+                    stage_boxes = {
+                        'performance': performance_box,
+                        'red_flags': red_flags_box,
+                        'strengths': strengths_box,
+                        'verdict': verdict_box,
+                    }
+
+                    if run_ai:
+                        # Render each stage's text as its chunks arrive
+                        ai_results = {}
+                        streamed = {stage: "" for stage in stage_boxes}
+                        with status_box, st.spinner("🔍 Analyzing financial data..."):
+                            with perf.span("llm.payload") as counts:
+                                data_str, payload_report = cached_llm_payload(data_key, df)
+                                counts['tokens'] = payload_report['tokens_after']
+                            for stage, chunk in stream_llm_analysis(api_key, data_str, model_name=model_name,
+                                                                    refresh=refresh_ai, results=ai_results,
+                                                                    recorder=perf):
+                                streamed[stage] += chunk
+                                stage_boxes[stage].markdown(streamed[stage] + " ▌")
+                        if "error" in ai_results: 
+                            status_box.error(f"❌ {ai_results['error']}")
+                        else: 
+                            st.session_state.ai_results = ai_results
+                            if ai_results.get('errors'):
+                                failed = ', '.join(ai_results['errors'])
+                                status_box.warning(f"⚠️ Analysis partially complete — failed: {failed}")
+                            else:
+                                status_box.success("✅ Analysis complete!")
+                        st.caption(f"Prompt payload: {payload_report['tokens_before']} → "
+                                   f"{payload_report['tokens_after']} tokens per analysis")
+
+                    res = st.session_state.get('ai_results', {})
+                    for stage, box in stage_boxes.items():
+                        box.markdown(res.get(stage, ''))
+
+        # Where the time went, per pipeline stage
+        with st.expander("⏱️ Performance"):
+            stages = perf.summary()
+            if stages:
+                perf_rows = [{
+                    'Stage': name,
+                    'Calls': stage['calls'],
+                    'Last (ms)': round(stage['last_seconds'] * 1000, 1),
+                    'Total (ms)': round(stage['seconds'] * 1000, 1),
+                    'Peak RSS Δ (MiB)': round(stage['rss_delta_bytes'] / 2**20, 1),
+                    'Counts': ', '.join(f"{key}: {value}" for key, value in stage['counts'].items()),
+                } for name, stage in stages.items()]
+                st.dataframe(pd.DataFrame(perf_rows), use_container_width=True, hide_index=True)
+                p_col1, p_col2, p_col3 = st.columns(3)
+                p_col1.download_button("Export JSON", perf.to_json(), file_name="performance.json",
+                                       mime="application/json", use_container_width=True)
+                p_col2.download_button("Export Prometheus", perf.to_prometheus(), file_name="performance.prom",
+                                       mime="text/plain", use_container_width=True)
+                if p_col3.button("Reset", use_container_width=True):
+                    perf.clear()
+                    st.rerun()
+            else:
+                st.caption("No stages recorded yet.")
     else:
         st.markdown("""
             <div style="text-align: center; padding: 60px 40px; border: 1.5px dashed rgba(139, 92, 246, 0.2); border-radius: 24px; background: rgba(139, 92, 246, 0.05); backdrop-filter: blur(20px);">
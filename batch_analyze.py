@@ -0,0 +1,212 @@
+"""
+Headless batch mode: extract -> normalize -> ratios for many filings in parallel.
+
+    python batch_analyze.py filings/ "exports/*.csv" --out results --workers 8
+
+Writes one row per (file, year) with every line item and ratio to
+results/line_items_and_ratios.parquet (or .csv), with a company column as well
+for multi-company CSV exports, a manifest used to resume
+interrupted runs, and errors.jsonl with one entry per file that failed.
+"""
+import argparse
+import glob
+import json
+import os
+import sys
+import time
+import traceback
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+import pandas as pd
+from cache import content_key
+from data_processing import process_multiple_tables
+from ingest import (SUPPORTED_EXTENSIONS, file_extension, load_tables, read_csv_normalized, csv_columns,
+                    detect_company_column, stack_company_frames)
+from ratio_analysis import calculate_ratios, calculate_panel_ratios
+
+MANIFEST_NAME = "manifest.jsonl"
+ERRORS_NAME = "errors.jsonl"
+PARTS_DIR = "parts"
+OUTPUT_STEM = "line_items_and_ratios"
+
+def find_inputs(patterns):
+    """
+    Expands directories (recursively) and glob patterns into a sorted list of supported files.
+    """
+    paths = set()
+    for pattern in patterns:
+        if os.path.isdir(pattern):
+            for root, _, names in os.walk(pattern):
+                paths.update(os.path.join(root, name) for name in names)
+        else:
+            paths.update(glob.glob(pattern, recursive=True))
+    return sorted(
+        os.path.abspath(p) for p in paths
+        if os.path.isfile(p) and file_extension(p) in SUPPORTED_EXTENSIONS
+    )
+
+def _fingerprint(path):
+    stat = os.stat(path)
+    return {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+
+def analyze_file(path):
+    """
+    Worker: runs one file through the pipeline and returns its (file, year) rows, or
+    (file, company, year) rows for a CSV export with a company column.
+    """
+    file_ext = file_extension(path)
+    if file_ext == "csv":
+        df = stack_company_frames(read_csv_normalized(path, company_col=detect_company_column(csv_columns(path))))
+    else:
+        pdf_options = {'prescreen': True, 'low_memory': True} if file_ext == "pdf" else {}
+        df = process_multiple_tables(load_tables(path, file_ext, **pdf_options))
+    if df.empty:
+        raise ValueError("No financial line items found")
+    if isinstance(df.index, pd.MultiIndex):
+        rows = df.sort_index().join(calculate_panel_ratios(df))
+    else:
+        rows = df.join(calculate_ratios(df))
+        rows.index.name = 'year'
+    rows = rows.reset_index()
+    rows['year'] = rows['year'].astype(str)
+    rows.insert(0, 'file', path)
+    return rows
+
+def _safe_analyze(path):
+    """
+    Wraps analyze_file so one bad file reports an error instead of killing the run.
+    """
+    start = time.perf_counter()
+    try:
+        return path, analyze_file(path), None, time.perf_counter() - start
+    except Exception as e:
+        return path, None, {'error': str(e), 'traceback': traceback.format_exc()}, time.perf_counter() - start
+
+def _analyze_alone(path):
+    """
+    Runs one file in a process of its own, so a hard crash takes down nothing else.
+    """
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=1) as executor:
+        try:
+            return executor.submit(_safe_analyze, path).result()
+        except BrokenProcessPool as e:
+            return path, None, {'error': f"Worker crashed: {e}", 'traceback': ''}, time.perf_counter() - start
+
+def analyze_files(paths, workers=None):
+    """
+    Yields _safe_analyze's (path, rows, error, seconds) for every path, in completion order,
+    with at most workers files in flight across a process pool.
+
+    A worker dying hard (e.g. a segfault or OOM inside a PDF library) breaks the whole
+    pool, failing every file in flight with it. Only those files can have caused it, so
+    each is re-run alone and just the one(s) crashing again are reported as crashed; a
+    new pool then carries on with the files that hadn't started.
+    """
+    workers = workers or os.cpu_count() or 1
+    pending = deque(paths)
+    while pending:
+        in_flight = {}
+        broken = []
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            while (pending or in_flight) and not broken:
+                while pending and len(in_flight) < workers:
+                    path = pending.popleft()
+                    in_flight[executor.submit(_safe_analyze, path)] = path
+                finished, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    path = in_flight.pop(future)
+                    try:
+                        result = future.result()
+                    except BrokenProcessPool:
+                        broken.append(path)
+                        continue
+                    yield result
+            # Once the pool is broken nothing still in flight will finish either
+            broken.extend(in_flight.values())
+        for path in broken:
+            yield _analyze_alone(path)
+
+def _load_manifest(out_dir):
+    done = {}
+    try:
+        with open(os.path.join(out_dir, MANIFEST_NAME), encoding="utf-8") as f:
+            for line in f:
+                entry = json.loads(line)
+                done[entry['file']] = entry
+    except FileNotFoundError:
+        pass
+    return done
+
+def _append_jsonl(path, entry):
+    with open(path, "a", encoding="utf-8") as f:
+        f.write(json.dumps(entry) + "\n")
+
+def _write_frame(df, path, fmt):
+    if fmt == "parquet":
+        df.to_parquet(path, index=False)
+    else:
+        df.to_csv(path, index=False)
+
+def _read_frame(path, fmt):
+    if fmt == "parquet":
+        return pd.read_parquet(path)
+    return pd.read_csv(path, dtype={'year': str, 'company': str})
+
+def run_batch(patterns, out_dir, workers=None, fmt="parquet", resume=True):
+    """
+    Processes every matching file across a process pool and writes the consolidated output.
+    Returns (succeeded, failed, skipped) counts.
+    """
+    os.makedirs(os.path.join(out_dir, PARTS_DIR), exist_ok=True)
+    manifest_path = os.path.join(out_dir, MANIFEST_NAME)
+    errors_path = os.path.join(out_dir, ERRORS_NAME)
+
+    files = find_inputs(patterns)
+    done = _load_manifest(out_dir) if resume else {}
+    todo = [p for p in files if p not in done or
+            {k: done[p].get(k) for k in ('size', 'mtime_ns')} != _fingerprint(p)]
+    skipped = len(files) - len(todo)
+    print(f"{len(files)} files found, {skipped} already done, {len(todo)} to process", file=sys.stderr)
+
+    succeeded = failed = 0
+    for n, (path, rows, error, seconds) in enumerate(analyze_files(todo, workers), start=1):
+        if error is None:
+            part = os.path.join(PARTS_DIR, f"{content_key(path)}.{fmt}")
+            _write_frame(rows, os.path.join(out_dir, part), fmt)
+            _append_jsonl(manifest_path, {'file': path, 'part': part, 'rows': len(rows), **_fingerprint(path)})
+            succeeded += 1
+            status = f"ok ({len(rows)} years)"
+        else:
+            _append_jsonl(errors_path, {'file': path, 'time': time.time(), **error})
+            failed += 1
+            status = f"FAILED: {error['error']}"
+        print(f"[{n}/{len(todo)}] {path} {status} in {seconds:.1f}s", file=sys.stderr)
+
+    # Consolidate every completed part, including those from earlier runs
+    parts = [_read_frame(os.path.join(out_dir, entry['part']), fmt)
+             for entry in _load_manifest(out_dir).values()
+             if os.path.exists(os.path.join(out_dir, entry['part']))]
+    if parts:
+        output_path = os.path.join(out_dir, f"{OUTPUT_STEM}.{fmt}")
+        _write_frame(pd.concat(parts, ignore_index=True), output_path, fmt)
+        print(f"Wrote {output_path}", file=sys.stderr)
+    return succeeded, failed, skipped
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Batch-analyze PDF/XLSX/CSV financial statements.")
+    parser.add_argument("inputs", nargs="+", help="files, directories or glob patterns")
+    parser.add_argument("--out", default="batch_output", help="output directory")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: CPU count)")
+    parser.add_argument("--format", dest="fmt", choices=["parquet", "csv"], default="parquet")
+    parser.add_argument("--no-resume", dest="resume", action="store_false",
+                        help="reprocess files already listed in the manifest")
+    args = parser.parse_args(argv)
+
+    succeeded, failed, skipped = run_batch(args.inputs, args.out, args.workers, args.fmt, args.resume)
+    print(f"Done: {succeeded} succeeded, {failed} failed, {skipped} skipped", file=sys.stderr)
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
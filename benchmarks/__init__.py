@@ -0,0 +1,4 @@
+"""
+Performance benchmarks. Run individual scripts from the repo root, e.g.
+python -m benchmarks.bench_normalize
+"""
@@ -0,0 +1,72 @@
+"""
+Multi-company CSV exports: read_csv_normalized (pyarrow and pandas-chunked engines)
+against reading the whole file with pd.read_csv and normalizing each company's rows.
+Each run happens in a fresh interpreter so peak RSS is per mode.
+
+    python -m benchmarks.bench_csv --companies 1000 --rows 500
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+from benchmarks.generators import write_company_export_csv
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+_MEASURE_SCRIPT = """
+import json, time
+import pandas as pd
+from perf import max_rss_bytes
+from data_processing import process_multiple_tables
+from ingest import read_csv_normalized
+baseline = max_rss_bytes()
+start = time.perf_counter()
+if {mode!r} == 'read_csv':
+    df = pd.read_csv({path!r})
+    frames = {{company: process_multiple_tables([rows.drop(columns=['Ticker']).reset_index(drop=True)])
+              for company, rows in df.groupby('Ticker', sort=False)}}
+else:
+    frames = read_csv_normalized({path!r}, company_col='Ticker', engine={mode!r})
+print(json.dumps({{'seconds': time.perf_counter() - start, 'companies': len(frames),
+                  'baseline_rss_bytes': baseline, 'peak_rss_bytes': max_rss_bytes()}}))
+"""
+
+MODES = ['read_csv', 'pandas', 'pyarrow']
+
+def measure(path, mode):
+    script = _MEASURE_SCRIPT.format(path=path, mode=mode)
+    result = subprocess.run([sys.executable, '-c', script], capture_output=True, text=True, cwd=REPO_ROOT)
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr[-2000:])
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Multi-company CSV ingest: streaming vs read_csv.")
+    parser.add_argument('--companies', type=int, default=500)
+    parser.add_argument('--rows', type=int, default=400, help="rows per company")
+    parser.add_argument('--years', type=int, default=5)
+    parser.add_argument('--out', help="also write the results as JSON")
+    args = parser.parse_args(argv)
+
+    results = []
+    with tempfile.TemporaryDirectory() as workdir:
+        path = write_company_export_csv(os.path.join(workdir, 'export.csv'), companies=args.companies,
+                                        rows=args.rows, years=args.years)
+        size_mib = os.path.getsize(path) / 2**20
+        print(f"{args.companies * args.rows:,} rows, {size_mib:.1f} MiB")
+        for mode in MODES:
+            result = {'mode': mode, **measure(path, mode)}
+            results.append(result)
+            growth_mib = (result['peak_rss_bytes'] - result['baseline_rss_bytes']) / 2**20
+            print(f"{mode:>10} {result['seconds']:8.2f}s {growth_mib:9.1f} MiB peak RSS growth "
+                  f"{result['companies']:>7} companies")
+
+    if args.out:
+        with open(args.out, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
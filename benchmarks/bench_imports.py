@@ -0,0 +1,111 @@
+"""
+Cold-start report: per-module import cost from `python -X importtime`, the heaviest
+packages each module pulls in, and the time until the app's landing page has rendered.
+
+    python -m benchmarks.bench_imports --out imports.json
+"""
+import argparse
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+DEFAULT_MODULES = ['pdf_extractor', 'llm_analysis', 'ingest', 'cache', 'data_processing', 'ratio_analysis']
+
+# Heavy third-party packages that should only load when their stage runs
+HEAVY_PACKAGES = ['pdfplumber', 'pdfminer', 'google.generativeai', 'plotly', 'pyarrow']
+
+_IMPORTTIME_LINE = re.compile(r'^import time:\s+(\d+)\s*\|\s*(\d+)\s*\|\s*(\S+)')
+
+# Runs the landing page once in a fresh interpreter; everything app.py imports at the
+# top happens inside that first run
+_FIRST_PAINT_SCRIPT = """
+import time, warnings
+warnings.simplefilter('ignore')
+from streamlit.testing.v1 import AppTest
+at = AppTest.from_file({app!r}, default_timeout=120)
+start = time.perf_counter()
+at.run()
+print(time.perf_counter() - start)
+"""
+
+def parse_importtime(stderr):
+    """
+    Parses `-X importtime` output into {package: (self_us, cumulative_us)}, keeping the
+    first (i.e. real) import of each package.
+    """
+    timings = {}
+    for line in stderr.splitlines():
+        match = _IMPORTTIME_LINE.match(line)
+        if match:
+            self_us, cumulative_us, name = match.groups()
+            timings.setdefault(name, (int(self_us), int(cumulative_us)))
+    return timings
+
+def import_report(module, repeat=3, top=8):
+    """
+    Imports module in repeat fresh interpreters and returns the median cumulative time,
+    the heavy packages it loaded and its most expensive top-level dependencies.
+    """
+    runs = []
+    for _ in range(repeat):
+        result = subprocess.run([sys.executable, '-X', 'importtime', '-W', 'ignore', '-c', f'import {module}'],
+                                capture_output=True, text=True, cwd=REPO_ROOT)
+        if result.returncode != 0:
+            raise RuntimeError(f"importing {module} failed:\n{result.stderr[-2000:]}")
+        runs.append(parse_importtime(result.stderr))
+
+    timings = runs[-1]
+    heaviest = sorted(((name, cumulative) for name, (_, cumulative) in timings.items()
+                       if '.' not in name and name != module),
+                      key=lambda item: item[1], reverse=True)[:top]
+    return {
+        'module': module,
+        'seconds': statistics.median(run[module][1] for run in runs) / 1e6,
+        'heavy_loaded': [name for name in HEAVY_PACKAGES if name in timings],
+        'heaviest': [{'package': name, 'seconds': cumulative / 1e6} for name, cumulative in heaviest],
+    }
+
+def first_paint_seconds(repeat=3, app='app.py'):
+    """
+    Median wall time for a fresh interpreter to render the landing page of app.
+    """
+    script = _FIRST_PAINT_SCRIPT.format(app=os.path.join(REPO_ROOT, app))
+    times = []
+    for _ in range(repeat):
+        result = subprocess.run([sys.executable, '-c', script], capture_output=True, text=True, cwd=REPO_ROOT)
+        if result.returncode != 0:
+            raise RuntimeError(f"rendering {app} failed:\n{result.stderr[-2000:]}")
+        times.append(float(result.stdout.strip().splitlines()[-1]))
+    return statistics.median(times)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Import-time and first-paint report.")
+    parser.add_argument('modules', nargs='*', default=DEFAULT_MODULES)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--no-first-paint', dest='first_paint', action='store_false')
+    parser.add_argument('--out', help="also write the report as JSON")
+    args = parser.parse_args(argv)
+
+    report = {'imports': [], 'first_paint_seconds': None}
+    for module in args.modules:
+        entry = import_report(module, args.repeat)
+        report['imports'].append(entry)
+        heaviest = ', '.join(f"{h['package']} {h['seconds'] * 1000:.0f}ms" for h in entry['heaviest'][:4])
+        print(f"{module:18s} {entry['seconds'] * 1000:8.1f} ms  heavy: {', '.join(entry['heavy_loaded']) or '-'}"
+              f"  ({heaviest})")
+    if args.first_paint:
+        report['first_paint_seconds'] = first_paint_seconds(args.repeat)
+        print(f"{'landing page':18s} {report['first_paint_seconds'] * 1000:8.1f} ms  (fresh process, AppTest run)")
+
+    if args.out:
+        with open(args.out, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
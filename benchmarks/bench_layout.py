@@ -0,0 +1,63 @@
+"""
+Table detection vs the text-layout fallback parser on ruled and text-only (unruled)
+statements: wall time and how many line-item values each recovers.
+
+    python -m benchmarks.bench_layout --pages 10 40 --repeat 3
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+import warnings
+from benchmarks.generators import write_statement_pdf
+from data_processing import process_multiple_tables
+from pdf_extractor import extract_tables_from_pdf, extract_layout_tables_from_pdf
+
+PARSERS = {
+    'tables': extract_tables_from_pdf,
+    'layout': extract_layout_tables_from_pdf,
+}
+
+def best_time(fn, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        times.append(time.perf_counter() - start)
+    return min(times), result
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Table detection vs text-layout parsing.")
+    parser.add_argument('--pages', type=int, nargs='+', default=[10, 40])
+    parser.add_argument('--tables-per-page', type=int, default=2)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--out', help="also write the results as JSON")
+    args = parser.parse_args(argv)
+    # pdfminer warns about the hand-built synthetic PDFs
+    warnings.simplefilter('ignore')
+
+    results = []
+    print(f"{'layout':>8} {'pages':>6} {'parser':>8} {'seconds':>9} {'tables':>7} {'values':>7}")
+    with tempfile.TemporaryDirectory() as workdir:
+        for ruled in (True, False):
+            for pages in args.pages:
+                path = write_statement_pdf(os.path.join(workdir, f'{pages}_{ruled}.pdf'), pages=pages,
+                                           tables_per_page=args.tables_per_page, ruled=ruled)
+                for name, extract in PARSERS.items():
+                    seconds, tables = best_time(lambda: extract(path), args.repeat)
+                    values = process_multiple_tables(tables).notna().sum().sum()
+                    result = {'ruled': ruled, 'pages': pages, 'parser': name, 'seconds': seconds,
+                              'tables': len(tables), 'values': int(values)}
+                    results.append(result)
+                    print(f"{'ruled' if ruled else 'text':>8} {pages:>6} {name:>8} {seconds:9.3f} "
+                          f"{len(tables):>7} {result['values']:>7}")
+
+    if args.out:
+        with open(args.out, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
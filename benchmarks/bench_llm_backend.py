@@ -0,0 +1,53 @@
+import argparse
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+from llm_analysis import MockBackend, configure_rate_limit, get_llm_analysis
+
+def _percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+def run_suite(backend, timeout):
+    start = time.perf_counter()
+    results = get_llm_analysis(None, "FINANCIAL STATEMENT DATA: load test", timeout=timeout,
+                               use_cache=False, backend=backend)
+    return time.perf_counter() - start, results
+
+def main(suites=40, concurrency=8, latency=0.2, jitter=0.3, error_rate=0.1, fatal_error_rate=0.0,
+         rate=50.0, burst=20, timeout=10.0):
+    """
+    Load-tests the full four-call analysis against MockBackend: throughput, tail latency
+    and how many suites came back complete, partial or failed.
+    """
+    configure_rate_limit(rate, burst)
+    backend = MockBackend(latency=latency, jitter=jitter, error_rate=error_rate,
+                          fatal_error_rate=fatal_error_rate, seed=0)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        runs = list(executor.map(lambda _: run_suite(backend, timeout), range(suites)))
+    elapsed = time.perf_counter() - start
+
+    latencies = [latency_s for latency_s, _ in runs]
+    failed = sum(1 for _, results in runs if 'error' in results)
+    partial = sum(1 for _, results in runs if 'errors' in results)
+    print(f"{suites} suites x 4 calls, concurrency {concurrency}, {backend.calls} backend calls "
+          f"({backend.calls - 4 * suites} retries)")
+    print(f"throughput {suites / elapsed:.2f} suites/s; latency p50 {statistics.median(latencies):.2f}s "
+          f"p95 {_percentile(latencies, 95):.2f}s p99 {_percentile(latencies, 99):.2f}s")
+    print(f"complete {suites - failed - partial}, partial {partial}, failed {failed}")
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=main.__doc__)
+    parser.add_argument('--suites', type=int, default=40)
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--latency', type=float, default=0.2)
+    parser.add_argument('--jitter', type=float, default=0.3)
+    parser.add_argument('--error-rate', type=float, default=0.1)
+    parser.add_argument('--fatal-error-rate', type=float, default=0.0)
+    parser.add_argument('--rate', type=float, default=50.0, help="requests/second for the shared limiter")
+    parser.add_argument('--burst', type=int, default=20)
+    parser.add_argument('--timeout', type=float, default=10.0)
+    args = parser.parse_args()
+    main(**vars(args))
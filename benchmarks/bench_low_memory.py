@@ -0,0 +1,74 @@
+"""
+Peak RSS of PDF table extraction as the page count grows, default vs low-memory mode.
+Each measurement runs in a fresh interpreter so peaks don't carry over between runs.
+
+    python -m benchmarks.bench_low_memory --pages 50 100 200 400
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+from benchmarks.generators import write_statement_pdf
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+_MEASURE_SCRIPT = """
+import json, time, warnings
+warnings.simplefilter('ignore')
+from perf import max_rss_bytes
+from pdf_extractor import extract_tables_from_pdf
+baseline = max_rss_bytes()
+start = time.perf_counter()
+tables = extract_tables_from_pdf({path!r}, **{options!r})
+print(json.dumps({{'seconds': time.perf_counter() - start, 'tables': len(tables),
+                  'baseline_rss_bytes': baseline, 'peak_rss_bytes': max_rss_bytes()}}))
+"""
+
+MODES = {
+    'default': {},
+    'low_memory': {'low_memory': True},
+}
+
+def measure(path, options):
+    script = _MEASURE_SCRIPT.format(path=path, options=options)
+    result = subprocess.run([sys.executable, '-c', script], capture_output=True, text=True, cwd=REPO_ROOT)
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr[-2000:])
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Peak RSS vs page count for PDF extraction.")
+    parser.add_argument('--pages', type=int, nargs='+', default=[25, 50, 100, 200])
+    parser.add_argument('--tables-per-page', type=int, default=3)
+    parser.add_argument('--memory-ceiling-mb', type=int, default=None,
+                        help="also measure low-memory mode with this RSS ceiling")
+    parser.add_argument('--out', help="also write the results as JSON")
+    args = parser.parse_args(argv)
+
+    modes = dict(MODES)
+    if args.memory_ceiling_mb:
+        modes[f'ceiling_{args.memory_ceiling_mb}mb'] = {'memory_ceiling': args.memory_ceiling_mb * 2**20}
+
+    results = []
+    print(f"{'pages':>6} " + ''.join(f"{mode:>22}" for mode in modes) + "   (peak RSS above baseline, time)")
+    with tempfile.TemporaryDirectory() as workdir:
+        for pages in args.pages:
+            path = write_statement_pdf(os.path.join(workdir, f'{pages}.pdf'), pages=pages,
+                                       tables_per_page=args.tables_per_page, prose_every=0)
+            cells = []
+            for mode, options in modes.items():
+                result = {'pages': pages, 'mode': mode, **measure(path, options)}
+                results.append(result)
+                growth_mib = (result['peak_rss_bytes'] - result['baseline_rss_bytes']) / 2**20
+                cells.append(f"{growth_mib:8.1f} MiB {result['seconds']:7.1f}s")
+            print(f"{pages:>6} " + ''.join(f"{cell:>22}" for cell in cells))
+
+    if args.out:
+        with open(args.out, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
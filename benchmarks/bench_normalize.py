@@ -0,0 +1,72 @@
+import time
+from data_processing import FINANCIAL_MAPPING, clean_value, clean_values, normalize_dataframe
+from benchmarks.generators import make_statement_table
+
+def legacy_normalize_dataframe(df):
+    """
+    The original keys x rows x aliases scan, kept as the reference for equivalence.
+    """
+    df.columns = [str(c).strip().lower() for c in df.columns]
+    label_col = df.columns[0]
+    year_cols = [c for c in df.columns if c != label_col]
+    results = {}
+    for standardized_key, aliases in FINANCIAL_MAPPING.items():
+        for _, row in df.iterrows():
+            label = str(row[label_col]).lower().strip()
+            if any(alias in label for alias in aliases):
+                results[standardized_key] = {year: clean_value(row[year]) for year in year_cols}
+                break
+    return results
+
+def _best_of(fn, df, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        frame = df.copy()
+        start = time.perf_counter()
+        result = fn(frame)
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+def per_cell_clean(block):
+    return block.map(clean_value)
+
+# clean_values must beat per-cell clean_value by at least this much, on one large block
+# and on the small row blocks normalize_dataframe hands it
+MIN_CLEAN_SPEEDUP = 1.5
+MIN_SMALL_CLEAN_SPEEDUP = 1.2
+
+def _best_of_calls(fn, block, calls, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(calls):
+            fn(block)
+        best = min(best, (time.perf_counter() - start) / calls)
+    return best
+
+def main(n_rows=10_000, repeat=3):
+    df = make_statement_table(n_rows)
+    legacy_s, legacy = _best_of(legacy_normalize_dataframe, df, repeat)
+    current_s, current = _best_of(normalize_dataframe, df, repeat)
+    assert current == legacy, "vectorized matcher diverged from the row-by-row scan"
+    print(f"normalize_dataframe on {n_rows:,} rows: legacy {legacy_s * 1000:.1f} ms, "
+          f"vectorized {current_s * 1000:.1f} ms ({legacy_s / current_s:.1f}x)")
+
+    block = df.iloc[:, 1:]
+    per_cell_s, expected = _best_of(per_cell_clean, block, repeat)
+    column_s, (values, _) = _best_of(clean_values, block, repeat)
+    assert values.equals(expected.astype(float)), "clean_values diverged from clean_value"
+    print(f"cleaning {block.size:,} cells: clean_value {per_cell_s * 1000:.1f} ms, "
+          f"clean_values {column_s * 1000:.1f} ms ({per_cell_s / column_s:.1f}x)")
+    assert per_cell_s / column_s >= MIN_CLEAN_SPEEDUP, "clean_values is no faster than clean_value"
+
+    # What normalize_dataframe cleans per table: the matched rows' year columns
+    small = make_statement_table(12).iloc[:11, 1:]
+    per_cell_s = _best_of_calls(per_cell_clean, small, 200, repeat)
+    column_s = _best_of_calls(clean_values, small, 200, repeat)
+    print(f"cleaning a {small.shape[0]}x{small.shape[1]} block: clean_value {per_cell_s * 1000:.3f} ms, "
+          f"clean_values {column_s * 1000:.3f} ms ({per_cell_s / column_s:.1f}x)")
+    assert per_cell_s / column_s >= MIN_SMALL_CLEAN_SPEEDUP, "clean_values is no faster on small blocks"
+
+if __name__ == '__main__':
+    main()
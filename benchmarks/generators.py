@@ -0,0 +1,175 @@
+"""
+Synthetic financial statements for benchmarks: CSV, XLSX and multi-page PDF files of
+configurable size. Everything is seeded, so the same arguments always produce the same file.
+"""
+import random
+import pandas as pd
+from data_processing import FINANCIAL_MAPPING
+
+# Labels that FINANCIAL_MAPPING recognises, in the order a statement would list them
+STATEMENT_LABELS = ['Revenue', 'Cost of Revenue', 'Operating Income', 'Net Income', 'Total Assets',
+                    'Total Liabilities', 'Total Equity', 'Current Assets', 'Current Liabilities',
+                    'Operating Cash Flow', 'Capital Expenditure', 'Total Debt']
+
+FILLER_LABELS = ['Cost of goods sold', 'Selling and marketing', 'Research and development',
+                 'Depreciation', 'Goodwill', 'Inventories', 'Accounts receivable', 'Deferred tax']
+
+def year_labels(years, last_year=2024):
+    """
+    Column headers for `years` fiscal years, most recent first as in a filing.
+    """
+    return [str(last_year - i) for i in range(years)]
+
+def _format_amount(value):
+    # Filings show negatives in parentheses with thousands separators
+    return f"({abs(value):,})" if value < 0 else f"{value:,}"
+
+def statement_rows(rows=12, years=3, seed=0):
+    """
+    Header plus `rows` rows of [label, value per year] as formatted strings. The first
+    rows are the recognisable STATEMENT_LABELS; any beyond that are filler items.
+    """
+    rnd = random.Random(seed)
+    data = [['Line Item'] + year_labels(years)]
+    for r in range(rows):
+        label = STATEMENT_LABELS[r] if r < len(STATEMENT_LABELS) else f"{rnd.choice(FILLER_LABELS)} {r}"
+        data.append([label] + [_format_amount(rnd.randint(-50_000, 200_000)) for _ in range(years)])
+    return data
+
+def make_statement_frame(rows=12, years=3, seed=0):
+    """
+    One statement table as a DataFrame of strings, shaped like the tables pdf_extractor yields.
+    """
+    data = statement_rows(rows, years, seed)
+    return pd.DataFrame(data[1:], columns=data[0])
+
+def make_statement_table(n_rows=10_000, years=('2021', '2022', '2023'), seed=0):
+    """
+    A single wide statement table: mostly filler labels with the FINANCIAL_MAPPING aliases
+    scattered through it, so matches are spread over the whole label column.
+    """
+    rnd = random.Random(seed)
+    aliases = [alias for aliases in FINANCIAL_MAPPING.values() for alias in aliases]
+    rows = []
+    for _ in range(n_rows):
+        if rnd.random() < 0.002:
+            label = rnd.choice(aliases).title()
+        else:
+            label = f"{rnd.choice(FILLER_LABELS)} {rnd.randint(1, 999)}"
+        values = [f"({rnd.randint(1, 99_999):,})" if rnd.random() < 0.2 else f"{rnd.randint(1, 99_999):,}"
+                  for _ in years]
+        rows.append([label] + values)
+    return pd.DataFrame(rows, columns=['Line Item', *years])
+
+def make_normalized_frame(periods=3, seed=0):
+    """
+    A frame shaped like process_multiple_tables output (periods as index, line items as
+    columns), for benchmarking ratio and prompt code without going through extraction.
+    """
+    rnd = random.Random(seed)
+    index = [str(2024 - periods + 1 + i) for i in range(periods)]
+    data = {key: [float(rnd.randint(-50_000, 200_000)) for _ in index] for key in FINANCIAL_MAPPING}
+    return pd.DataFrame(data, index=index)
+
+def write_statement_csv(path, rows=12, years=3, seed=0):
+    make_statement_frame(rows, years, seed).to_csv(path, index=False)
+    return path
+
+def write_company_export_csv(path, companies=100, rows=200, years=5, seed=0):
+    """
+    A data-vendor style export: one wide CSV of `companies` statements stacked on top of
+    each other, with a Ticker column in front of the label and year columns.
+    """
+    with open(path, 'w', encoding='utf-8', newline='') as f:
+        for c in range(companies):
+            df = make_statement_frame(rows, years, seed * 100_003 + c)
+            df.insert(0, 'Ticker', f"T{c:05d}")
+            df.to_csv(f, index=False, header=c == 0)
+    return path
+
+def write_statement_xlsx(path, rows=12, years=3, sheets=1, seed=0, cover_rows=0):
+    """
+    Writes `sheets` statement sheets to one workbook (needs openpyxl), preceded by a
+    narrative "Cover" sheet of cover_rows rows when cover_rows > 0.
+    """
+    with pd.ExcelWriter(path, engine='openpyxl') as writer:
+        if cover_rows:
+            cover = pd.DataFrame({'Notes': [f"Basis of preparation, paragraph {i}" for i in range(cover_rows)]})
+            cover.to_excel(writer, sheet_name="Cover", index=False)
+        for s in range(sheets):
+            make_statement_frame(rows, years, seed + s).to_excel(writer, sheet_name=f"Statement {s + 1}", index=False)
+    return path
+
+def _pdf_escape(text):
+    return text.replace('\\', '\\\\').replace('(', '\\(').replace(')', '\\)')
+
+def _table_ops(data, top, x0=40, label_width=160, value_width=80, row_height=14, ruled=True):
+    """
+    PDF drawing operators for one table, ruled so pdfplumber's line-based detection finds
+    it unless ruled=False. Returns (ops, height).
+    """
+    xs = [x0, x0 + label_width]
+    for _ in data[0][1:]:
+        xs.append(xs[-1] + value_width)
+    height = row_height * len(data)
+    ops = []
+    if ruled:
+        ops += [f"{xs[0]} {top - i * row_height} m {xs[-1]} {top - i * row_height} l S" for i in range(len(data) + 1)]
+        ops += [f"{x} {top} m {x} {top - height} l S" for x in xs]
+    for i, row in enumerate(data):
+        y = top - (i + 1) * row_height + 4
+        ops += [f"BT /F1 8 Tf {xs[j] + 3} {y} Td ({_pdf_escape(cell)}) Tj ET" for j, cell in enumerate(row)]
+    return ops, height
+
+def _prose_ops(page_number, lines=40):
+    return [f"BT /F1 10 Tf 50 {750 - 15 * i} Td (Management discussion of results and risk factors, "
+            f"page {page_number} line {i}) Tj ET" for i in range(lines)]
+
+def _page_content(page_number, prose, tables_per_page, rows, years, seed, ruled=True):
+    if prose:
+        return "\n".join(_prose_ops(page_number))
+    ops = []
+    top = 760
+    for t in range(tables_per_page):
+        table_ops, height = _table_ops(statement_rows(rows, years, seed * 100_003 + page_number * 101 + t), top,
+                                       ruled=ruled)
+        ops += table_ops
+        top -= height + 30
+    return "\n".join(ops)
+
+def write_statement_pdf(path, pages=10, tables_per_page=1, rows=12, years=3, prose_every=2, seed=0, ruled=True):
+    """
+    Writes a multi-page PDF of statement tables. Every prose_every-th page is narrative
+    text with no tables (0 disables prose pages), like the MD&A sections of a real filing.
+    With ruled=False the tables are only text laid out in columns, which line-based table
+    detection can't find. Built by hand with the base-14 Helvetica font, so no PDF library
+    is needed.
+    Tables taller than the page are clipped, so keep tables_per_page * (rows + 1) under ~50.
+    """
+    objects = [b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>", None]
+    font_id, pages_id = 1, 2
+    kids = []
+    for p in range(pages):
+        prose = bool(prose_every) and p % prose_every == prose_every - 1
+        content = _page_content(p + 1, prose, tables_per_page, rows, years, seed, ruled).encode('latin-1')
+        objects.append(b"<< /Length %d >>\nstream\n%s\nendstream" % (len(content), content))
+        objects.append(b"<< /Type /Page /Parent %d 0 R /MediaBox [0 0 612 792] "
+                       b"/Resources << /Font << /F1 %d 0 R >> >> /Contents %d 0 R >>"
+                       % (pages_id, font_id, len(objects)))
+        kids.append(len(objects))
+    objects[pages_id - 1] = (b"<< /Type /Pages /Kids [%s] /Count %d >>"
+                             % (b" ".join(b"%d 0 R" % k for k in kids), len(kids)))
+    objects.append(b"<< /Type /Catalog /Pages %d 0 R >>" % pages_id)
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n%s\nendobj\n" % (number, body)
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    out += b"".join(b"%010d 00000 n \n" % offset for offset in offsets)
+    out += b"trailer\n<< /Size %d /Root %d 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, len(objects), xref)
+    with open(path, 'wb') as f:
+        f.write(out)
+    return path
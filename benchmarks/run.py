@@ -0,0 +1,193 @@
+"""
+End-to-end benchmark suite over synthetic filings. Times each pipeline stage, records its
+memory use and writes the results as JSON so runs from different commits can be compared:
+
+    python -m benchmarks.run --out before.json
+    git checkout my-branch
+    python -m benchmarks.run --out after.json --compare before.json
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timezone
+import pandas as pd
+from benchmarks.generators import (make_normalized_frame, make_statement_table, write_company_export_csv,
+                                   write_statement_csv, write_statement_pdf, write_statement_xlsx)
+from data_processing import normalize_dataframe, process_multiple_tables
+from ingest import load_tables, read_csv_normalized
+from llm_analysis import format_data_for_llm
+from pdf_extractor import extract_tables_from_pdf, extract_layout_tables_from_pdf
+from ratio_analysis import calculate_ratios
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+def _max_rss_bytes():
+    """
+    Peak resident set size of this process so far (a high-water mark, so it only grows).
+    """
+    if resource is None:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return rss if sys.platform == 'darwin' else rss * 1024
+
+def measure(fn, repeat=5):
+    """
+    Runs fn repeat times for timing, then once more under tracemalloc for peak Python
+    allocations (kept out of the timed runs because tracing slows everything down).
+    """
+    fn()  # warm-up: imports, caches, lazy initialisation
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    try:
+        fn()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return {
+        'repeat': repeat,
+        'seconds_min': min(times),
+        'seconds_median': statistics.median(times),
+        'seconds_max': max(times),
+        'peak_alloc_bytes': peak,
+        'max_rss_bytes': _max_rss_bytes(),
+    }
+
+def build_cases(workdir, pages=20, tables_per_page=2, rows=12, years=3, table_rows=10_000, periods=40):
+    """
+    Generates the input files under workdir and returns [(name, params, fn)].
+    """
+    pdf_path = write_statement_pdf(os.path.join(workdir, 'statement.pdf'), pages=pages,
+                                   tables_per_page=tables_per_page, rows=rows, years=years)
+    csv_path = write_statement_csv(os.path.join(workdir, 'statement.csv'), rows=rows, years=years)
+    xlsx_path = write_statement_xlsx(os.path.join(workdir, 'statement.xlsx'), rows=rows, years=years)
+    workbook_path = write_statement_xlsx(os.path.join(workdir, 'workbook.xlsx'), rows=table_rows // 4, years=years,
+                                         sheets=3, cover_rows=table_rows // 4)
+    export_path = write_company_export_csv(os.path.join(workdir, 'export.csv'), companies=table_rows // 200,
+                                           rows=200, years=years)
+    pdf_params = {'pages': pages, 'tables_per_page': tables_per_page, 'rows': rows, 'years': years}
+
+    tables = extract_tables_from_pdf(pdf_path)
+    big_table = make_statement_table(table_rows)
+    df = make_normalized_frame(periods)
+    ratios_df = calculate_ratios(df)
+
+    return [
+        ('extract_tables_from_pdf', pdf_params, lambda: extract_tables_from_pdf(pdf_path)),
+        ('extract_tables_from_pdf[prescreen]', pdf_params,
+         lambda: extract_tables_from_pdf(pdf_path, prescreen=True)),
+        ('extract_layout_tables_from_pdf', pdf_params, lambda: extract_layout_tables_from_pdf(pdf_path)),
+        ('load_tables[csv]', {'rows': rows, 'years': years}, lambda: load_tables(csv_path, 'csv')),
+        ('load_tables[xlsx]', {'rows': rows, 'years': years}, lambda: load_tables(xlsx_path, 'xlsx')),
+        ('load_tables[xlsx, 4 sheets]', {'rows': table_rows // 4, 'sheets': 4, 'years': years},
+         lambda: load_tables(workbook_path, 'xlsx')),
+        ('read_csv_normalized', {'companies': table_rows // 200, 'rows': 200, 'years': years},
+         lambda: read_csv_normalized(export_path, company_col='Ticker')),
+        ('normalize_dataframe', {'rows': table_rows, 'years': 3},
+         lambda: normalize_dataframe(big_table.copy())),
+        ('process_multiple_tables', {'tables': len(tables), **pdf_params},
+         lambda: process_multiple_tables([t.copy() for t in tables])),
+        ('calculate_ratios', {'periods': periods}, lambda: calculate_ratios(df)),
+        ('format_data_for_llm', {'periods': periods}, lambda: format_data_for_llm(df, ratios_df)),
+    ]
+
+def _git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def run(repeat=5, only=None, **sizes):
+    """
+    Runs every case (or those whose name contains one of only) and returns the JSON report.
+    """
+    results = []
+    with tempfile.TemporaryDirectory() as workdir:
+        for name, params, fn in build_cases(workdir, **sizes):
+            if only and not any(pattern in name for pattern in only):
+                continue
+            result = {'name': name, 'params': params, **measure(fn, repeat)}
+            results.append(result)
+            print(f"{name:38s} {result['seconds_median'] * 1000:10.2f} ms  "
+                  f"peak alloc {result['peak_alloc_bytes'] / 2**20:8.2f} MiB", file=sys.stderr)
+    return {
+        'meta': {
+            'commit': _git_commit(),
+            'timestamp': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'pandas': pd.__version__,
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+        },
+        'sizes': sizes,
+        'results': results,
+    }
+
+def compare(report, baseline, threshold=0.10):
+    """
+    Prints the change in best-of time against a baseline report (the minimum is far less
+    noisy than the median for short cases). Returns the names of cases that got slower by
+    more than threshold (as a fraction).
+    """
+    before = {r['name']: r for r in baseline['results']}
+    regressions = []
+    print(f"vs {baseline['meta'].get('commit') or 'baseline'}:", file=sys.stderr)
+    for result in report['results']:
+        old = before.get(result['name'])
+        if old is None:
+            continue
+        change = result['seconds_min'] / old['seconds_min'] - 1
+        flag = ''
+        if change > threshold:
+            regressions.append(result['name'])
+            flag = '  REGRESSION'
+        print(f"{result['name']:38s} {change:+8.1%}{flag}", file=sys.stderr)
+    return regressions
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the extraction -> ratios -> prompt pipeline.")
+    parser.add_argument('--pages', type=int, default=20)
+    parser.add_argument('--tables-per-page', type=int, default=2)
+    parser.add_argument('--rows', type=int, default=12, help="rows per statement table")
+    parser.add_argument('--years', type=int, default=3)
+    parser.add_argument('--table-rows', type=int, default=10_000, help="rows in the normalize_dataframe table")
+    parser.add_argument('--periods', type=int, default=40, help="periods in the ratio/prompt frame")
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--only', nargs='*', help="run only cases whose name contains one of these")
+    parser.add_argument('--out', default='benchmark_results.json')
+    parser.add_argument('--compare', help="baseline JSON from an earlier run")
+    parser.add_argument('--threshold', type=float, default=0.10, help="slowdown that counts as a regression")
+    args = parser.parse_args(argv)
+
+    report = run(args.repeat, args.only, pages=args.pages, tables_per_page=args.tables_per_page,
+                 rows=args.rows, years=args.years, table_rows=args.table_rows, periods=args.periods)
+    with open(args.out, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+    print(f"Wrote {args.out}", file=sys.stderr)
+
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            regressions = compare(report, json.load(f), args.threshold)
+        return 1 if regressions else 0
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
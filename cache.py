@@ -0,0 +1,147 @@
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+import pandas as pd
+
+try:
+    import pyarrow  # noqa: F401 - parquet engine for the on-disk layer
+    PARQUET_AVAILABLE = True
+except ImportError:
+    PARQUET_AVAILABLE = False
+
+# Bump whenever extraction/normalization changes what a given file parses to,
+# so stale entries from older parsers are never served.
+PARSER_VERSION = "2"
+
+CACHE_DIR = os.environ.get(
+    "FIN_ANALYZER_CACHE_DIR",
+    os.path.join(os.path.expanduser("~"), ".cache", "ai-financial-analyzer"),
+)
+
+def content_key(*parts):
+    """
+    SHA-256 hex digest over the given bytes/str parts, used as a cache key.
+    """
+    digest = hashlib.sha256()
+    for part in parts:
+        if isinstance(part, str):
+            part = part.encode("utf-8")
+        digest.update(part)
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+def parsed_file_key(file_bytes):
+    """
+    Cache key for an uploaded file: hash of its bytes plus the parser version.
+    """
+    return content_key(file_bytes, PARSER_VERSION)
+
+def frame_fingerprint(df):
+    """
+    Stable content hash of a DataFrame (values, index and column names), for keying
+    caches on the data itself rather than on object identity.
+    """
+    values = pd.util.hash_pandas_object(df, index=True).to_numpy().tobytes()
+    return content_key(values, repr(list(df.columns)), repr(df.dtypes.astype(str).tolist()))
+
+def evict_lru(directory, max_bytes, suffix):
+    """
+    Deletes the least recently used files ending in suffix until the directory's total
+    size is within max_bytes. Recency is the file's mtime, which readers bump on access.
+    """
+    try:
+        entries = []
+        for name in os.listdir(directory):
+            if name.endswith(suffix):
+                path = os.path.join(directory, name)
+                stat = os.stat(path)
+                entries.append((stat.st_mtime, stat.st_size, path))
+    except FileNotFoundError:
+        return
+
+    total = sum(size for _, size, _ in entries)
+    for _, size, path in sorted(entries):
+        if total <= max_bytes:
+            break
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        total -= size
+
+class ParsedFrameCache:
+    """
+    Two-level cache of normalized DataFrames: an in-process LRU of recent entries in front
+    of a size-bounded Parquet directory that survives restarts. If pyarrow isn't installed
+    only the in-process layer is used.
+    """
+
+    def __init__(self, directory=CACHE_DIR, max_disk_bytes=256 * 1024 * 1024, max_memory_entries=16):
+        self.directory = os.path.join(directory, "parsed")
+        self.max_disk_bytes = max_disk_bytes
+        self.max_memory_entries = max_memory_entries
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _path(self, key):
+        return os.path.join(self.directory, f"{key}.parquet")
+
+    def _remember(self, key, df):
+        with self._lock:
+            self._memory[key] = df
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.max_memory_entries:
+                self._memory.popitem(last=False)
+
+    def get(self, key):
+        """
+        Returns a copy of the cached DataFrame for key, or None on a miss.
+        """
+        with self._lock:
+            df = self._memory.get(key)
+            if df is not None:
+                self._memory.move_to_end(key)
+                return df.copy()
+
+        if not PARQUET_AVAILABLE:
+            return None
+        path = self._path(key)
+        try:
+            df = pd.read_parquet(path)
+            os.utime(path)
+        except (FileNotFoundError, OSError, ValueError):
+            return None
+        self._remember(key, df)
+        return df.copy()
+
+    def put(self, key, df):
+        """
+        Stores df under key in memory and, when possible, on disk; then enforces the size bound.
+        """
+        self._remember(key, df.copy())
+        if not PARQUET_AVAILABLE:
+            return
+        # Sessions are threads of one process, and two may store the same upload at once
+        tmp_path = f"{self._path(key)}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            df.to_parquet(tmp_path)
+            os.replace(tmp_path, self._path(key))
+        except (OSError, ValueError):
+            # Disk layer is best effort; the in-process copy is still served
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            return
+        evict_lru(self.directory, self.max_disk_bytes, ".parquet")
+
+_parse_cache = None
+
+def get_parse_cache():
+    """
+    Process-wide ParsedFrameCache, so entries outlive Streamlit script reruns.
+    """
+    global _parse_cache
+    if _parse_cache is None:
+        _parse_cache = ParsedFrameCache()
+    return _parse_cache
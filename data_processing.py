@@ -1,6 +1,7 @@
 import pandas as pd
 import numpy as np
 import re
+import time
 
 # Mapping of common financial terms to standardized keys
 FINANCIAL_MAPPING = {
@@ -17,6 +18,12 @@ FINANCIAL_MAPPING = {
     'total_debt': ['total debt', 'long term debt', 'short term debt', 'borrowings']
 }
 
+# One regex alternation of escaped aliases per standardized key, in mapping order
+LINE_ITEM_PATTERNS = {
+    key: '|'.join(re.escape(alias) for alias in aliases)
+    for key, aliases in FINANCIAL_MAPPING.items()
+}
+
 def clean_value(val):
     """
     Cleans string values into floats. Handles (parentheses) as negative numbers.
@@ -38,9 +45,121 @@ def clean_value(val):
     except ValueError:
         return 0.0
 
-def normalize_dataframe(df):
+# Blocks of up to this many cells are cleaned cell by cell: below it, the fixed cost of each
+# vectorized pandas call outweighs what it saves (normalize_dataframe passes ~11 x 3 blocks)
+CLEAN_VALUES_LOOP_CELLS = 2000
+
+# What clean_values keeps of a text cell, and what float() accepts once only that remains
+_NON_NUMERIC = r'[^0-9.-]'
+_FLOAT_TEXT = r'-?(?:[0-9]+\.?[0-9]*|\.[0-9]+)'
+_NON_NUMERIC_RE = re.compile(_NON_NUMERIC)
+_FLOAT_TEXT_RE = re.compile(_FLOAT_TEXT)
+
+def _clean_cell(val):
+    """
+    clean_values for a single cell: (value, failed).
+    """
+    if isinstance(val, (int, float)):
+        return (0.0, False) if val != val else (float(val), False)
+    if val is None or pd.isna(val):
+        return 0.0, False
+    text = str(val)
+    cleaned = _NON_NUMERIC_RE.sub('', text)
+    if '(' in text and ')' in text:
+        cleaned = '-' + cleaned
+    if _FLOAT_TEXT_RE.fullmatch(cleaned):
+        return float(cleaned), False
+    return 0.0, bool(text.strip())
+
+def _clean_text(text):
+    """
+    Vectorized _clean_cell for a Series of strings (NaN for missing): (values, failed) arrays.
+    """
+    cleaned = text.str.replace(_NON_NUMERIC, '', regex=True)
+    negative = (text.str.contains('(', regex=False, na=False)
+                & text.str.contains(')', regex=False, na=False)).to_numpy(dtype=bool)
+    # '-' is prepended to negatives, so one that already starts with '-' can't parse
+    valid = (cleaned.str.fullmatch(_FLOAT_TEXT, na=False).to_numpy(dtype=bool)
+             & ~(negative & cleaned.str.startswith('-', na=False).to_numpy(dtype=bool)))
+    values = np.zeros(len(text))
+    cleaned = cleaned[valid]
+    # Arrow-backed strings parse far faster through pyarrow's own cast
+    arrow = getattr(cleaned.dtype, 'storage', None) == 'pyarrow'
+    values[valid] = cleaned.astype('float64[pyarrow]' if arrow else float).to_numpy(dtype=float)
+    values[negative] *= -1
+    # Only cells that didn't parse need the (rarer) blank check
+    unparsed = ~valid & text.notna().to_numpy()
+    failed = np.zeros(len(text), dtype=bool)
+    failed[unparsed] = text[unparsed].str.strip().ne('').to_numpy(dtype=bool)
+    return values, failed
+
+def _clean_frame(frame):
+    """
+    clean_values as plain (values, failed) arrays shaped like frame.
+    """
+    n = frame.size
+    if all(pd.api.types.is_numeric_dtype(dtype) for dtype in frame.dtypes):
+        values = frame.to_numpy(dtype=float, na_value=np.nan)
+        return np.where(np.isnan(values), 0.0, values), np.zeros(frame.shape, dtype=bool)
+    if n <= CLEAN_VALUES_LOOP_CELLS:
+        cells = [_clean_cell(val) for val in frame.to_numpy(dtype=object).ravel()]
+        values = np.array([value for value, _ in cells], dtype=float).reshape(frame.shape)
+        failed = np.array([bad for _, bad in cells], dtype=bool).reshape(frame.shape)
+        return values, failed
+    if all(dtype == 'str' for dtype in frame.dtypes):
+        # Text columns are cleaned as they are, stacked column by column
+        text = pd.concat([frame.iloc[:, j] for j in range(frame.shape[1])], ignore_index=True)
+        values, failed = _clean_text(text)
+        return values.reshape(frame.shape, order='F'), failed.reshape(frame.shape, order='F')
+
+    cells = frame.to_numpy(dtype=object).ravel()
+    # Numbers are taken as-is; everything else goes through the string path
+    if pd.api.types.infer_dtype(cells, skipna=True) in ('string', 'empty'):
+        is_number = np.zeros(n, dtype=bool)
+    else:
+        is_number = np.fromiter((isinstance(val, (int, float)) for val in cells), dtype=bool, count=n)
+    values = np.zeros(n)
+    failed = np.zeros(n, dtype=bool)
+    numbers = cells[is_number].astype(float)
+    values[is_number] = np.where(np.isnan(numbers), 0.0, numbers)
+    values[~is_number], failed[~is_number] = _clean_text(pd.Series(cells[~is_number], dtype='str'))
+    return values.reshape(frame.shape), failed.reshape(frame.shape)
+
+def clean_values(block):
+    """
+    Column-level counterpart of clean_value for a DataFrame (or Series) of cells.
+    Returns (values, failed): float values parsed the same way clean_value parses each cell
+    (thousands separators, (parentheses) negatives, currency symbols, blanks as 0.0), and a
+    boolean mask of non-blank cells that could not be parsed and were set to 0.0.
+    Digits are matched as ASCII 0-9.
+    """
+    frame = block.to_frame() if isinstance(block, pd.Series) else block
+    values, failed = _clean_frame(frame)
+    values = pd.DataFrame(values, index=frame.index, columns=frame.columns)
+    failed = pd.DataFrame(failed, index=frame.index, columns=frame.columns)
+    if isinstance(block, pd.Series):
+        return values.iloc[:, 0], failed.iloc[:, 0]
+    return values, failed
+
+def match_line_items(labels):
+    """
+    Matches a whole column of line-item labels against FINANCIAL_MAPPING at once.
+    Returns {standardized_key: row position} for the first row whose lowercased, stripped
+    label contains any of the key's aliases, in FINANCIAL_MAPPING order.
+    """
+    labels = pd.Series(labels).reset_index(drop=True).astype(str).str.lower().str.strip()
+    matches = {}
+    for standardized_key, pattern in LINE_ITEM_PATTERNS.items():
+        hits = labels.str.contains(pattern, regex=True, na=False).to_numpy(dtype=bool)
+        if hits.any():
+            matches[standardized_key] = int(hits.argmax())
+    return matches
+
+def normalize_dataframe(df, failures=None):
     """
     Attempts to find horizontal headers (years) and vertical labels (line items).
+    Pass a dict as failures to collect {standardized_key: [years]} for values that were
+    present but could not be parsed (they are reported as 0.0).
     """
     # Clean the dataframe column names
     df.columns = [str(c).strip().lower() for c in df.columns]
@@ -61,35 +180,69 @@ def normalize_dataframe(df):
         # For simplicity in MVP, we expect years as headers or we use indices
         year_cols = [c for c in df.columns if c != label_col]
 
-    for standardized_key, aliases in FINANCIAL_MAPPING.items():
-        for _, row in df.iterrows():
-            label = str(row[label_col]).lower().strip()
-            if any(alias in label for alias in aliases):
-                # Found a match, extract values for available years
-                data_points = {}
-                for year in year_cols:
-                    try:
-                        data_points[year] = clean_value(row[year])
-                    except:
-                        continue
-                results[standardized_key] = data_points
-                break # Move to next standardized key
+    matches = match_line_items(df.iloc[:, 0])
+    if not matches:
+        return results
+
+    # Duplicate header names can't be read as a single cell per row, so they are skipped
+    duplicated = set(df.columns[df.columns.duplicated()])
+    unique_year_cols = [c for c in dict.fromkeys(year_cols) if c not in duplicated]
+    block = df.iloc[list(matches.values()), [df.columns.get_loc(c) for c in unique_year_cols]]
+    values, failed = _clean_frame(block)
+
+    for i, standardized_key in enumerate(matches):
+        # Found a match, extract values for available years
+        results[standardized_key] = dict(zip(unique_year_cols, values[i].tolist()))
+        if failures is not None and failed[i].any():
+            failures[standardized_key] = [year for year, bad in zip(unique_year_cols, failed[i]) if bad]
                 
     return results
 
+def merge_table(master_data, df):
+    """
+    Folds one table's normalized line items into master_data (in place) and returns it.
+    Later tables overwrite earlier values for the same line item and year.
+    """
+    norm_data = normalize_dataframe(df)
+    for key, year_data in norm_data.items():
+        if key not in master_data:
+            master_data[key] = year_data
+        else:
+            master_data[key].update(year_data)
+    return master_data
+
+def master_to_dataframe(master_data):
+    """
+    Converts the master dictionary to a DataFrame: Years as index, Line items as columns.
+    """
+    return pd.DataFrame(master_data).sort_index()
+
 def process_multiple_tables(list_of_dfs):
     """
     Combines results from multiple tables into a single master dictionary.
     """
     master_data = {}
     for df in list_of_dfs:
-        norm_data = normalize_dataframe(df)
-        for key, year_data in norm_data.items():
-            if key not in master_data:
-                master_data[key] = year_data
-            else:
-                master_data[key].update(year_data)
-    
-    # Convert to DataFrame: Years as index, Line items as columns
-    final_df = pd.DataFrame(master_data).sort_index()
-    return final_df
+        merge_table(master_data, df)
+    return master_to_dataframe(master_data)
+
+def process_table_stream(tables, stats=None):
+    """
+    Incremental variant of process_multiple_tables for (page_number, DataFrame) streams
+    such as pdf_extractor.iter_tables_from_pdf. Yields (page_number, master_data) after each
+    table is merged, so callers can show partial line items while later pages are parsed.
+    Nothing keeps a reference to a table once it has been merged.
+    Pass a dict as stats to get tables (merged so far) and seconds (spent merging) back;
+    it is updated as the stream goes.
+    """
+    if stats is None:
+        stats = {}
+    stats.update(tables=0, seconds=0.0)
+    master_data = {}
+    for page_number, df in tables:
+        start = time.perf_counter()
+        merge_table(master_data, df)
+        del df
+        stats['seconds'] += time.perf_counter() - start
+        stats['tables'] += 1
+        yield page_number, master_data
@@ -0,0 +1,361 @@
+import datetime
+import importlib.util
+import io
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+import numpy as np
+import pandas as pd
+from data_processing import LINE_ITEM_PATTERNS, clean_values
+from pdf_extractor import extract_tables_from_pdf, extract_layout_tables_from_pdf, pool_context
+
+SUPPORTED_EXTENSIONS = ('pdf', 'xlsx', 'csv')
+
+# A sheet whose first this many rows mention no FINANCIAL_MAPPING line item is skipped
+# without reading the rest of it (cover pages, notes, assumptions...)
+SHEET_PRESCREEN_ROWS = 100
+
+# Sheets are only parsed across processes when the workbook has at least this many rows
+# in total; below that, reopening the workbook in every worker costs more than it saves
+EXCEL_PARALLEL_MIN_ROWS = 50_000
+
+# Rows per chunk when a CSV is streamed through pandas; the pyarrow reader streams blocks
+# of CSV_BLOCK_BYTES instead
+CSV_CHUNK_ROWS = 200_000
+CSV_BLOCK_BYTES = 16 * 1024 * 1024
+
+# Header names (lowercased) recognised as the company column of a multi-company export
+COMPANY_COLUMN_NAMES = ('company', 'company name', 'company_name', 'ticker', 'symbol', 'entity', 'issuer')
+
+_LINE_ITEM_RE = re.compile('|'.join(LINE_ITEM_PATTERNS.values()))
+_YEAR_CELL_RE = re.compile(r'(?:fy\s*)?20\d{2}', re.IGNORECASE)
+
+def file_extension(name):
+    return str(name).rsplit('.', 1)[-1].lower()
+
+def _reopenable(source):
+    """
+    Returns something that can be read more than once, including by worker processes:
+    a path or the raw bytes.
+    """
+    if isinstance(source, (str, os.PathLike, bytes)):
+        return source
+    if hasattr(source, 'getvalue'):
+        return source.getvalue()
+    source.seek(0)
+    return source.read()
+
+def _open_workbook(source):
+    # Imported on first use, like pdfplumber: CSV and PDF runs never need openpyxl
+    from openpyxl import load_workbook
+    if isinstance(source, bytes):
+        source = io.BytesIO(source)
+    # data_only: formulas come back as their last computed values, as with pd.read_excel
+    return load_workbook(source, read_only=True, data_only=True)
+
+def _is_year_cell(cell):
+    if isinstance(cell, (datetime.date, datetime.datetime)):
+        return True
+    if isinstance(cell, float) and cell.is_integer():
+        cell = int(cell)
+    return isinstance(cell, (int, str)) and bool(_YEAR_CELL_RE.fullmatch(str(cell).strip()))
+
+def _is_line_item_row(row):
+    return any(isinstance(cell, str) and _LINE_ITEM_RE.search(cell.lower()) for cell in row)
+
+def _looks_like_statement(rows):
+    return any(_is_line_item_row(row) for row in rows)
+
+def _header_row(rows):
+    """
+    Index of the header among a sheet's first rows. A year such as 2024 can't be told
+    apart from an amount of 2024 on its own, so a row above the first line item is the
+    header when most of its cells after the label are years, or when it holds a year
+    written as text or a date. Otherwise the first row is, as with pd.read_excel.
+    """
+    first_item = next((i for i, row in enumerate(rows) if _is_line_item_row(row)), 0)
+    if first_item == 0:
+        return 0
+    cells = [cell for cell in rows[first_item - 1][1:] if cell is not None and cell != '']
+    if cells and sum(_is_year_cell(cell) for cell in cells) * 2 >= len(cells):
+        return first_item - 1
+    for i, row in enumerate(rows[:first_item]):
+        if any(_is_year_cell(cell) and isinstance(cell, (str, datetime.date)) for cell in row[1:]):
+            return i
+    return 0
+
+def _sheet_table(worksheet, stats=None):
+    """
+    Streams one read-only worksheet into a DataFrame, or None when it doesn't look like a
+    statement (judged from its first SHEET_PRESCREEN_ROWS rows) or has no data. Blank
+    rows are dropped as they're read. Title rows above a year header are skipped (see
+    _header_row).
+    """
+    rows = []
+    for row in worksheet.iter_rows(values_only=True):
+        if any(cell is not None and cell != '' for cell in row):
+            rows.append(row)
+        if len(rows) == SHEET_PRESCREEN_ROWS and not _looks_like_statement(rows):
+            break
+    if stats is not None:
+        stats['rows_read'] = stats.get('rows_read', 0) + len(rows)
+    if not rows or not _looks_like_statement(rows[:SHEET_PRESCREEN_ROWS]):
+        return None
+
+    header_at = _header_row(rows[:SHEET_PRESCREEN_ROWS])
+    width = max(len(row) for row in rows)
+    header = list(rows[header_at]) + [None] * (width - len(rows[header_at]))
+    columns = [f"Unnamed: {i}" if cell is None else cell for i, cell in enumerate(header)]
+    df = pd.DataFrame(rows[header_at + 1:], columns=range(width))
+    df.columns = columns
+    # Leading blank columns (indented layouts) would otherwise hide the label column
+    df = df.dropna(how='all', axis=1)
+    if df.empty:
+        return None
+    return df
+
+def _read_sheet(source, sheet_name):
+    """
+    Worker entry point: opens the workbook itself and parses one sheet.
+    """
+    stats = {}
+    workbook = _open_workbook(source)
+    try:
+        return _sheet_table(workbook[sheet_name], stats), stats.get('rows_read', 0)
+    finally:
+        workbook.close()
+
+def read_excel_tables(source, parallel=False, max_workers=None, stats=None):
+    """
+    Reads every worksheet of an .xlsx workbook (path, bytes or file-like) in openpyxl's
+    read-only streaming mode and returns one DataFrame per sheet that looks like a
+    financial statement, in workbook order, for process_multiple_tables.
+
+    Sheets whose first SHEET_PRESCREEN_ROWS rows mention no line item are skipped after
+    those rows. With parallel=True, workbooks of EXCEL_PARALLEL_MIN_ROWS rows or more
+    (by their recorded dimensions) are parsed a sheet per task across a process pool of
+    max_workers (default os.cpu_count()); smaller ones, or environments where a pool
+    can't start, are read serially. Pass a dict as stats to get sheets, sheets_skipped
+    and rows_read back.
+    """
+    if stats is None:
+        stats = {}
+    stats.update({'sheets': 0, 'sheets_skipped': 0, 'rows_read': 0})
+    source = _reopenable(source)
+
+    workbook = _open_workbook(source)
+    try:
+        worksheets = workbook.worksheets
+        stats['sheets'] = len(worksheets)
+        total_rows = sum(ws.max_row or 0 for ws in worksheets)
+        workers = max_workers or os.cpu_count() or 1
+        use_pool = parallel and workers > 1 and len(worksheets) > 1 and total_rows >= EXCEL_PARALLEL_MIN_ROWS
+        if not use_pool:
+            tables = [_sheet_table(ws, stats) for ws in worksheets]
+        names = [ws.title for ws in worksheets]
+    finally:
+        workbook.close()
+
+    if use_pool:
+        try:
+            with ProcessPoolExecutor(max_workers=min(workers, len(names)), mp_context=pool_context()) as executor:
+                results = list(executor.map(_read_sheet, [source] * len(names), names))
+            tables = [table for table, _ in results]
+            stats['rows_read'] = sum(rows_read for _, rows_read in results)
+        except (BrokenProcessPool, OSError):
+            return read_excel_tables(source, parallel=False, stats=stats)
+
+    stats['sheets_skipped'] = sum(table is None for table in tables)
+    return [table for table in tables if table is not None]
+
+def _as_file(source):
+    # Reopenable sources (see _reopenable) as something pandas and pyarrow can read from the start
+    return io.BytesIO(source) if isinstance(source, bytes) else source
+
+def csv_columns(source):
+    """
+    Header of a CSV (path, bytes or file-like) without reading its rows.
+    """
+    return list(pd.read_csv(_as_file(_reopenable(source)), nrows=0).columns)
+
+def detect_company_column(columns):
+    """
+    The first column named like a company identifier (see COMPANY_COLUMN_NAMES), or None.
+    """
+    return next((c for c in columns if str(c).strip().lower() in COMPANY_COLUMN_NAMES), None)
+
+def _csv_chunks(source, columns, chunksize, engine):
+    """
+    Streams the given columns of a CSV as DataFrames of strings, in file order.
+    """
+    if engine == 'pyarrow':
+        import pyarrow as pa
+        import pyarrow.csv as pa_csv
+        reader = pa_csv.open_csv(
+            _as_file(source),
+            read_options=pa_csv.ReadOptions(block_size=CSV_BLOCK_BYTES),
+            convert_options=pa_csv.ConvertOptions(include_columns=columns, strings_can_be_null=True,
+                                                  column_types={c: pa.string() for c in columns}))
+        for batch in reader:
+            yield batch.to_pandas()
+    else:
+        for chunk in pd.read_csv(_as_file(source), usecols=columns, dtype=str, chunksize=chunksize):
+            yield chunk[columns]
+
+def _parse_amounts(block):
+    """
+    Float values for a block of CSV cells read as strings. Cells pd.to_numeric can read
+    (including scientific notation such as 1.5e6) become numbers first, as pd.read_csv
+    would have made them; clean_values then takes those as-is and parses the rest
+    (thousands separators, (negatives), currency symbols, blanks).
+    """
+    numeric = block.apply(pd.to_numeric, errors='coerce')
+    cells = block.astype(object).where(numeric.isna(), numeric.astype(object))
+    values, _ = clean_values(cells)
+    return values
+
+def read_csv_normalized(source, company_col=None, chunksize=CSV_CHUNK_ROWS, engine=None, stats=None):
+    """
+    Streams a wide CSV export (a label column, then one column per year, optionally with
+    a company column) straight into normalized frames: {company: DataFrame} with each
+    frame shaped like process_multiple_tables output, or {None: DataFrame} when
+    company_col is None. Rows with no company, and companies with no recognised line
+    item, are left out.
+
+    Only the company, label and year columns are read, all as strings. Each chunk is
+    matched against FINANCIAL_MAPPING as it arrives and only each company's first row per
+    line item is kept, so the raw table is never held in memory. The kept rows are
+    parsed in one pass at the end (see _parse_amounts), giving the values
+    pd.read_csv followed by normalize_dataframe would give for each company's rows.
+
+    engine is 'pyarrow' (streams CSV_BLOCK_BYTES blocks; the default when pyarrow is
+    installed) or 'pandas' (chunks of chunksize rows). Pass a dict as stats to get
+    rows_read, chunks and rows_kept back.
+    """
+    if stats is None:
+        stats = {}
+    stats.update({'rows_read': 0, 'chunks': 0, 'rows_kept': 0})
+    if engine is None:
+        engine = 'pyarrow' if importlib.util.find_spec('pyarrow') is not None else 'pandas'
+    source = _reopenable(source)
+
+    header = csv_columns(source)
+    if company_col is not None and company_col not in header:
+        raise ValueError(f"No column named {company_col!r} in the CSV")
+    others = [c for c in header if c != company_col]
+    if not others:
+        return {}
+    label_col = others[0]
+    # Same year-column rule as normalize_dataframe
+    year_cols = [c for c in others[1:] if re.match(r'20\d{2}', str(c).strip().lower())] or others[1:]
+    columns = ([company_col] if company_col is not None else []) + [label_col] + year_cols
+
+    keys = list(LINE_ITEM_PATTERNS)
+    found = [set() for _ in keys]
+    kept = []
+    # For each (company, line item) first seen: its index in LINE_ITEM_PATTERNS and the
+    # position of the row it came from among the kept rows
+    entry_keys = []
+    entry_rows = []
+    n_kept = 0
+    for chunk in _csv_chunks(source, columns, chunksize, engine):
+        stats['rows_read'] += len(chunk)
+        stats['chunks'] += 1
+        if company_col is not None:
+            chunk = chunk[chunk[company_col].notna()]
+        labels = chunk[label_col].fillna('').str.lower().str.strip()
+        # One pass with every alias first; the per-key passes only see matching rows
+        candidates = np.flatnonzero(labels.str.contains(_LINE_ITEM_RE, na=False).to_numpy(dtype=bool))
+        if not len(candidates):
+            continue
+        labels = labels.iloc[candidates]
+        if company_col is not None:
+            companies = chunk[company_col].to_numpy(dtype=object)[candidates]
+        else:
+            companies = np.full(len(candidates), None, dtype=object)
+
+        keep = np.zeros(len(chunk), dtype=bool)
+        chunk_entries = []
+        for k, pattern in enumerate(LINE_ITEM_PATTERNS.values()):
+            hits = np.flatnonzero(labels.str.contains(pattern, regex=True, na=False).to_numpy(dtype=bool))
+            if not len(hits):
+                continue
+            # First hit per company in this chunk, for companies without one from earlier chunks
+            hit_companies = pd.Series(companies[hits])
+            new = (~hit_companies.duplicated() & ~hit_companies.isin(found[k])).to_numpy()
+            found[k].update(hit_companies[new])
+            rows = candidates[hits[new]]
+            keep[rows] = True
+            chunk_entries.append((k, rows))
+        if not keep.any():
+            continue
+        kept_position = np.cumsum(keep) - 1 + n_kept
+        for k, rows in chunk_entries:
+            entry_keys.append(np.full(len(rows), k))
+            entry_rows.append(kept_position[rows])
+        kept.append(chunk[keep])
+        n_kept += int(keep.sum())
+    stats['rows_kept'] = n_kept
+    if not kept:
+        return {}
+
+    # normalize_dataframe's rules for the year columns: lowercased names, duplicates skipped
+    names = [str(c).strip().lower() for c in year_cols]
+    duplicated = {name for name in names if names.count(name) > 1}
+    value_cols = [c for c, name in zip(year_cols, names) if name not in duplicated]
+    years = [name for name in names if name not in duplicated]
+
+    kept = pd.concat(kept, ignore_index=True)
+    values = _parse_amounts(kept[value_cols])
+    entry_keys = np.concatenate(entry_keys)
+    entry_rows = np.concatenate(entry_rows)
+    if company_col is not None:
+        entry_companies = kept[company_col].to_numpy(dtype=object)[entry_rows]
+    else:
+        entry_companies = np.full(len(entry_rows), None, dtype=object)
+    entries = pd.DataFrame({'company': entry_companies, 'key': entry_keys, 'row': entry_rows})
+    # Companies in order of appearance, line items in FINANCIAL_MAPPING order, as
+    # process_multiple_tables would lay them out
+    entries = entries.sort_values(['row', 'key'], kind='stable')
+    entries['company_order'] = entries.groupby('company', sort=False, dropna=False).ngroup()
+    entries = entries.sort_values(['company_order', 'key'], kind='stable')
+
+    matrix = values.to_numpy()
+    frames = {}
+    for _, group in entries.groupby('company_order', sort=False):
+        frame = pd.DataFrame(matrix[group['row'].to_numpy()].T, index=years,
+                             columns=[keys[k] for k in group['key']])
+        frames[group['company'].iloc[0]] = frame.sort_index()
+    return frames
+
+def stack_company_frames(frames):
+    """
+    read_csv_normalized output as one frame: the frame itself for a file without a
+    company column, otherwise every company's frame stacked under a (company, year)
+    MultiIndex (the panel shape calculate_panel_ratios takes). Empty if nothing matched.
+    """
+    if not frames:
+        return pd.DataFrame()
+    if list(frames) == [None]:
+        return frames[None]
+    return pd.concat(frames, names=['company', 'year'])
+
+def load_tables(source, file_ext, excel_options=None, **pdf_options):
+    """
+    Reads an uploaded file or a path into the list of raw tables that
+    process_multiple_tables expects. pdf_options are passed to extract_tables_from_pdf;
+    PDFs where it finds no tables are re-read with the text-layout parser.
+    Workbooks are read with read_excel_tables, which gets excel_options.
+    """
+    if file_ext == "pdf":
+        tables = extract_tables_from_pdf(source, **pdf_options)
+        if not tables:
+            tables = extract_layout_tables_from_pdf(source, low_memory=pdf_options.get('low_memory', False),
+                                                    memory_ceiling=pdf_options.get('memory_ceiling'))
+        return tables
+    if file_ext == "xlsx":
+        return read_excel_tables(source, **(excel_options or {}))
+    if file_ext == "csv":
+        return [pd.read_csv(source)]
+    raise ValueError(f"Unsupported file type: .{file_ext}")
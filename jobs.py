@@ -0,0 +1,121 @@
+"""
+Background extraction jobs, so parsing a long PDF doesn't hold the Streamlit script thread.
+The job lives in st.session_state; reruns poll its progress and can cancel it.
+"""
+import threading
+import time
+from data_processing import process_table_stream, master_to_dataframe
+from pdf_extractor import iter_tables_from_pdf, iter_layout_tables_from_pdf
+
+class ExtractionJob:
+    """
+    Extracts the tables from a PDF on a daemon thread (which in turn fans pages out over
+    a process pool when parallel=True) and folds each one into master_data through
+    process_table_stream as it arrives, so no raw table outlives its page. line_items
+    lists what has been found so far. Reads of its attributes from other threads are
+    safe; status goes pending -> running -> done / cancelled / failed.
+
+    key identifies what is being parsed (e.g. the upload's cache key) so callers can tell
+    whether a stored job still matches the current file. extract_options are passed to
+    iter_tables_from_pdf. With layout_fallback=True, a document where table detection
+    finds nothing is parsed again with iter_layout_tables_from_pdf; method then says
+    which parser produced the tables and fallback_seconds how long the second pass took.
+    """
+
+    def __init__(self, pdf_bytes, key=None, layout_fallback=False, **extract_options):
+        self.key = key
+        self.layout_fallback = layout_fallback
+        self.method = 'tables'
+        self.fallback_seconds = 0.0
+        self.status = 'pending'
+        self.pages_done = 0
+        self.pages_total = None
+        self.master_data = {}
+        self.line_items = []
+        self.stats = {}
+        # tables merged and seconds spent merging them, from process_table_stream
+        self.normalize_stats = {'tables': 0, 'seconds': 0.0}
+        self.error = None
+        self.seconds = 0.0
+        self._pdf_bytes = pdf_bytes
+        self._extract_options = extract_options
+        self._cancel = threading.Event()
+        self._thread = threading.Thread(target=self._run, name=f"extraction-job-{key}", daemon=True)
+
+    def start(self):
+        self.status = 'running'
+        self._thread.start()
+        return self
+
+    def cancel(self):
+        """
+        Asks the job to stop at the next page (or page range, when parallel).
+        """
+        self._cancel.set()
+
+    def join(self, timeout=None):
+        self._thread.join(timeout)
+
+    @property
+    def running(self):
+        return self.status in ('pending', 'running')
+
+    @property
+    def cancelling(self):
+        return self.running and self._cancel.is_set()
+
+    @property
+    def tables_found(self):
+        return self.normalize_stats['tables']
+
+    def result(self):
+        """
+        The normalized DataFrame (years as index, line items as columns) once the job is done.
+        """
+        return master_to_dataframe(self.master_data)
+
+    @property
+    def progress(self):
+        """
+        Fraction of pages processed, 0.0 until the page count is known.
+        """
+        if not self.pages_total:
+            return 0.0
+        return min(self.pages_done / self.pages_total, 1.0)
+
+    def _on_progress(self, pages_done, pages_total):
+        self.pages_done = pages_done
+        self.pages_total = pages_total
+
+    def _fold(self, tables):
+        for _, master_data in process_table_stream(tables, self.normalize_stats):
+            self.master_data = master_data
+            # A fresh list each time, so readers on other threads never see it change size
+            self.line_items = list(master_data)
+
+    def _run(self):
+        start = time.perf_counter()
+        try:
+            self._fold(iter_tables_from_pdf(self._pdf_bytes, stats=self.stats, progress=self._on_progress,
+                                            cancel=self._cancel, **self._extract_options))
+            if self.layout_fallback and not self.tables_found and not self._cancel.is_set():
+                self._run_layout_fallback()
+            status = 'cancelled' if self._cancel.is_set() else 'done'
+        except Exception as e:
+            self.error = str(e)
+            status = 'failed'
+        finally:
+            self.seconds = time.perf_counter() - start
+            # Only the merged line items are needed from here on
+            self._pdf_bytes = None
+        self.status = status
+
+    def _run_layout_fallback(self):
+        start = time.perf_counter()
+        self.method = 'text layout'
+        self.pages_done = 0
+        tables = iter_layout_tables_from_pdf(self._pdf_bytes, progress=self._on_progress, cancel=self._cancel,
+                                             low_memory=self._extract_options.get('low_memory', False),
+                                             memory_ceiling=self._extract_options.get('memory_ceiling'))
+        self._fold(tables)
+        self.fallback_seconds = time.perf_counter() - start
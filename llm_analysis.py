@@ -1,5 +1,13 @@
-import google.generativeai as genai
 import os
+import json
+import pandas as pd
+import queue
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from cache import CACHE_DIR, content_key, evict_lru
+from perf import span
 from prompts import (
     PERFORMANCE_SUMMARY_PROMPT,
     RED_FLAG_DETECTOR_PROMPT,
@@ -7,49 +15,381 @@ from prompts import (
     VERDICT_PROMPT
 )
 
-def get_llm_analysis(api_key, financial_data_str, model_name="gemini-1.5-flash"):
+# Seconds allowed for each stage (including any retries)
+DEFAULT_TIMEOUT = 60
+
+# Retry policy for transient failures: exponential backoff with full jitter
+MAX_RETRIES = 4
+BACKOFF_BASE = 0.5
+BACKOFF_CAP = 8.0
+
+# Process-wide request rate shared by every call (requests per second, burst size)
+RATE_LIMIT = 1.0
+RATE_BURST = 4
+
+# The three analyses only depend on the financial data, so they can run concurrently
+ANALYSIS_PROMPTS = {
+    'performance': PERFORMANCE_SUMMARY_PROMPT,
+    'red_flags': RED_FLAG_DETECTOR_PROMPT,
+    'strengths': STRENGTH_AND_MOAT_PROMPT,
+}
+
+# Local cache of Gemini responses, keyed by (model, template id, prompt hash)
+RESPONSE_CACHE_DIR = os.path.join(CACHE_DIR, "llm")
+RESPONSE_CACHE_TTL = 7 * 24 * 3600
+RESPONSE_CACHE_MAX_BYTES = 32 * 1024 * 1024
+
+_cache_stats = {'hits': 0, 'misses': 0}
+_cache_stats_lock = threading.Lock()
+
+def get_cache_stats():
     """
-    Orchestrates the 3 separate LLM calls plus the final verdict.
+    Returns the process-wide response cache hit/miss counters.
+    """
+    with _cache_stats_lock:
+        return dict(_cache_stats)
+
+def _count(outcome):
+    with _cache_stats_lock:
+        _cache_stats[outcome] += 1
+
+def _response_cache_path(model_name, template_id, prompt):
+    key = content_key(model_name, template_id, content_key(prompt))
+    return os.path.join(RESPONSE_CACHE_DIR, f"{key}.json")
+
+def _read_cached_response(path):
     """
+    Returns the cached response text at path, or None if missing, unreadable or expired.
+    """
+    try:
+        with open(path, encoding="utf-8") as f:
+            entry = json.load(f)
+        if time.time() - entry['created'] > RESPONSE_CACHE_TTL:
+            os.remove(path)
+            return None
+        os.utime(path)
+        return entry['text']
+    except (OSError, ValueError, KeyError):
+        return None
+
+def _write_cached_response(path, model_name, template_id, text):
+    entry = {'model': model_name, 'template': template_id, 'created': time.time(), 'text': text}
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
     try:
+        os.makedirs(RESPONSE_CACHE_DIR, exist_ok=True)
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(entry, f)
+        os.replace(tmp_path, path)
+    except OSError:
+        # Caching is best effort; the response itself is still returned
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        return
+    evict_lru(RESPONSE_CACHE_DIR, RESPONSE_CACHE_MAX_BYTES, ".json")
+
+class RetryableError(Exception):
+    """
+    A transient backend failure (rate limit, timeout, overload) that is worth retrying.
+    """
+
+# google.api_core exception class names for responses that are worth retrying
+_RETRYABLE_ERROR_NAMES = {
+    'ResourceExhausted', 'TooManyRequests', 'ServiceUnavailable',
+    'DeadlineExceeded', 'InternalServerError', 'GatewayTimeout',
+}
+
+def _is_retryable(error):
+    return (isinstance(error, (RetryableError, TimeoutError, ConnectionError))
+            or type(error).__name__ in _RETRYABLE_ERROR_NAMES)
+
+class TokenBucket:
+    """
+    Thread-safe token bucket. acquire() blocks until a token is available and returns
+    False instead if that would take past the deadline (a time.monotonic() value).
+    """
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = float(capacity)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def configure(self, rate, capacity):
+        with self._lock:
+            self.rate = rate
+            self.capacity = capacity
+            self._tokens = min(self._tokens, float(capacity))
+
+    def acquire(self, deadline=None):
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return True
+                wait_s = (1 - self._tokens) / self.rate
+            if deadline is not None and now + wait_s > deadline:
+                return False
+            time.sleep(wait_s)
+
+RATE_LIMITER = TokenBucket(RATE_LIMIT, RATE_BURST)
+
+def configure_rate_limit(rate, burst):
+    """
+    Changes the process-wide request rate (requests/second) and burst size.
+    """
+    RATE_LIMITER.configure(rate, burst)
+
+def _genai():
+    """
+    Imports google.generativeai on first use: the SDK takes about a second to load, and
+    sessions that never call Gemini shouldn't pay for it at startup.
+    """
+    import google.generativeai as genai
+    return genai
+
+class GeminiBackend:
+    """
+    Backend that streams responses from Gemini through google.generativeai.
+    """
+
+    def __init__(self, api_key, model_name="gemini-1.5-flash"):
+        genai = _genai()
         genai.configure(api_key=api_key)
-        
         # Clean the model name - sometimes names come with 'models/' prefix
-        clean_name = model_name.split('/')[-1]
-        model = genai.GenerativeModel(clean_name)
-        
+        self.model = genai.GenerativeModel(model_name.split('/')[-1])
+        self.model_name = self.model.model_name
+
+    def stream(self, prompt, timeout):
+        for chunk in self.model.generate_content(prompt, stream=True, request_options={"timeout": timeout}):
+            try:
+                text = chunk.text
+            except ValueError:
+                # Chunks that only carry finish/safety metadata have no text
+                continue
+            if text:
+                yield text
+
+class MockBackend:
+    """
+    Offline backend for tests and load tests. Each call waits latency (+ up to jitter)
+    seconds, then streams a canned response in chunks. error_rate of calls fail with a
+    RetryableError (as a 429 would) and fatal_error_rate with a non-retryable error.
+    """
+
+    def __init__(self, model_name="mock", latency=0.5, jitter=0.0, error_rate=0.0,
+                 fatal_error_rate=0.0, chunks=4, seed=None):
+        self.model_name = model_name
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.fatal_error_rate = fatal_error_rate
+        self.chunks = chunks
+        self.calls = 0
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def stream(self, prompt, timeout):
+        with self._lock:
+            self.calls += 1
+            delay = self.latency + self._random.uniform(0, self.jitter)
+            roll = self._random.random()
+        if delay > timeout:
+            time.sleep(timeout)
+            raise RetryableError(f"Mock call timed out after {timeout:.1f}s")
+        time.sleep(delay)
+        if roll < self.error_rate:
+            raise RetryableError("429 Mock rate limit")
+        if roll < self.error_rate + self.fatal_error_rate:
+            raise ValueError("Mock fatal error")
+        words = f"Mock {self.model_name} analysis of a {len(prompt)}-character prompt.".split()
+        step = max(1, -(-len(words) // self.chunks))
+        for i in range(0, len(words), step):
+            yield ' '.join(words[i:i + step]) + ' '
+
+def _stream_with_retry(backend, prompt, deadline, cancel=None, stats=None):
+    """
+    Streams one call through the shared rate limiter, retrying transient failures with
+    exponential backoff and full jitter. Retries only happen before the first chunk, never
+    past deadline (a time.monotonic() value), and stop as soon as cancel is set.
+    If stats is a dict, its 'retries' entry is incremented for every retry.
+    """
+    attempt = 0
+    while True:
+        if cancel is not None and cancel.is_set():
+            raise TimeoutError("Cancelled")
+        remaining = deadline - time.monotonic()
+        if remaining <= 0 or not RATE_LIMITER.acquire(deadline):
+            raise TimeoutError("Deadline exceeded before the request could be sent")
+
+        started = False
+        try:
+            for text in backend.stream(prompt, timeout=deadline - time.monotonic()):
+                if cancel is not None and cancel.is_set():
+                    raise TimeoutError("Cancelled")
+                started = True
+                yield text
+            return
+        except Exception as e:
+            if started or not _is_retryable(e) or attempt >= MAX_RETRIES:
+                raise
+            delay = random.uniform(0, min(BACKOFF_CAP, BACKOFF_BASE * 2 ** attempt))
+            if time.monotonic() + delay >= deadline:
+                raise
+            attempt += 1
+            if stats is not None:
+                stats['retries'] = stats.get('retries', 0) + 1
+            time.sleep(delay)
+
+def _generate_stream(backend, prompt, deadline, template_id=None, use_cache=True, refresh=False, cancel=None,
+                     stats=None):
+    """
+    Streams one call, yielding text chunks as they arrive. A cached response is yielded as
+    a single chunk; refresh skips the lookup but still stores the fresh response.
+    stats (a dict) receives prompt_tokens, response_tokens, cache_hits and retries.
+    """
+    if stats is None:
+        stats = {}
+    stats['prompt_tokens'] = estimate_tokens(prompt)
+    path = None
+    if use_cache and template_id is not None:
+        path = _response_cache_path(backend.model_name, template_id, prompt)
+        if not refresh:
+            cached = _read_cached_response(path)
+            if cached is not None:
+                _count('hits')
+                stats['cache_hits'] = 1
+                stats['response_tokens'] = estimate_tokens(cached)
+                yield cached
+                return
+        _count('misses')
+
+    parts = []
+    for text in _stream_with_retry(backend, prompt, deadline, cancel, stats):
+        parts.append(text)
+        yield text
+    stats['response_tokens'] = estimate_tokens(''.join(parts))
+    if not parts:
+        raise ValueError("The model returned an empty response.")
+
+    if path is not None:
+        _write_cached_response(path, backend.model_name, template_id, ''.join(parts))
+
+def stream_llm_analysis(api_key, financial_data_str, model_name="gemini-1.5-flash", timeout=DEFAULT_TIMEOUT,
+                        use_cache=True, refresh=False, results=None, backend=None, recorder=None):
+    """
+    Streaming variant of get_llm_analysis. Yields (stage, text_chunk) tuples as the model
+    produces them. The performance, red_flags and strengths stages stream concurrently, so
+    their chunks are interleaved; the verdict stage streams once they have finished.
+    Pass a dict as results to receive the same final dict get_llm_analysis returns, and a
+    backend (e.g. MockBackend) to use something other than Gemini. With a perf.PerfRecorder
+    as recorder, each stage is recorded as an 'llm.<stage>' span with its token counts.
+    """
+    if results is None:
         results = {}
-        
-        # 1. Performance Summary
-        resp1 = model.generate_content(PERFORMANCE_SUMMARY_PROMPT.format(financial_data=financial_data_str))
-        results['performance'] = resp1.text
-
-        # 2. Red Flags
-        resp2 = model.generate_content(RED_FLAG_DETECTOR_PROMPT.format(financial_data=financial_data_str))
-        results['red_flags'] = resp2.text
-
-        # 3. Strengths
-        resp3 = model.generate_content(STRENGTH_AND_MOAT_PROMPT.format(financial_data=financial_data_str))
-        results['strengths'] = resp3.text
-        
-        # 4. Final Verdict
-        verdict_input = VERDICT_PROMPT.format(
-            performance_summary=results['performance'],
-            red_flags=results['red_flags'],
-            strengths=results['strengths']
-        )
-        resp4 = model.generate_content(verdict_input)
-        results['verdict'] = resp4.text
-        
-        return results
+    errors = {}
+    try:
+        if backend is None:
+            backend = GeminiBackend(api_key, model_name)
     except Exception as e:
-        return {"error": str(e)}
+        results['error'] = str(e)
+        return
+
+    # 1-3. Performance Summary, Red Flags and Strengths, fanned out together
+    events = queue.Queue()
+    cancel = threading.Event()
+    deadline = time.monotonic() + timeout
+
+    def run_stage(stage, prompt):
+        with span(recorder, f"llm.{stage}") as counts:
+            try:
+                for chunk in _generate_stream(backend, prompt, deadline, stage, use_cache, refresh, cancel, counts):
+                    events.put((stage, chunk, None))
+                events.put((stage, None, None))
+            except Exception as e:
+                counts['errors'] = 1
+                events.put((stage, None, e))
+
+    executor = ThreadPoolExecutor(max_workers=len(ANALYSIS_PROMPTS))
+    parts = {stage: [] for stage in ANALYSIS_PROMPTS}
+    pending = set(ANALYSIS_PROMPTS)
+    try:
+        for stage, prompt in ANALYSIS_PROMPTS.items():
+            executor.submit(run_stage, stage, prompt.format(financial_data=financial_data_str))
+        while pending:
+            try:
+                stage, chunk, error = events.get(timeout=max(deadline - time.monotonic(), 0))
+            except queue.Empty:
+                for stage in pending:
+                    errors[stage] = f"Timed out after {timeout}s"
+                break
+            if error is not None:
+                errors[stage] = str(error)
+                pending.discard(stage)
+            elif chunk is None:
+                results[stage] = ''.join(parts[stage])
+                pending.discard(stage)
+            else:
+                parts[stage].append(chunk)
+                yield stage, chunk
+    finally:
+        # Stop stragglers from retrying or streaming further, and don't block on them
+        cancel.set()
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    if not any(stage in results for stage in ANALYSIS_PROMPTS):
+        results['error'] = "; ".join(f"{stage}: {msg}" for stage, msg in errors.items())
+        return
+
+    # 4. Final Verdict
+    verdict_input = VERDICT_PROMPT.format(
+        performance_summary=results.get('performance', 'Not available.'),
+        red_flags=results.get('red_flags', 'Not available.'),
+        strengths=results.get('strengths', 'Not available.')
+    )
+    verdict_parts = []
+    with span(recorder, "llm.verdict") as counts:
+        try:
+            verdict_deadline = time.monotonic() + timeout
+            for chunk in _generate_stream(backend, verdict_input, verdict_deadline, 'verdict', use_cache, refresh,
+                                          stats=counts):
+                verdict_parts.append(chunk)
+                yield 'verdict', chunk
+            results['verdict'] = ''.join(verdict_parts)
+        except Exception as e:
+            counts['errors'] = 1
+            errors['verdict'] = str(e)
+
+    if errors:
+        results['errors'] = errors
+
+def get_llm_analysis(api_key, financial_data_str, model_name="gemini-1.5-flash", timeout=DEFAULT_TIMEOUT,
+                     use_cache=True, refresh=False, backend=None, recorder=None):
+    """
+    Orchestrates the 3 separate LLM calls plus the final verdict.
+    The performance, red-flag and strength calls run concurrently; the verdict waits on them.
+    Each stage has timeout seconds, within which rate limiting and retries of transient
+    errors (429s, timeouts) happen. If only some analyses fail, the rest are still
+    returned (and fed to the verdict) with the failures listed under 'errors'.
+    Responses are cached locally unless use_cache is False; refresh=True re-asks the
+    model and overwrites the cached answers.
+    """
+    results = {}
+    for _ in stream_llm_analysis(api_key, financial_data_str, model_name=model_name, timeout=timeout,
+                                 use_cache=use_cache, refresh=refresh, results=results, backend=backend,
+                                 recorder=recorder):
+        pass
+    return results
 
 def list_available_models(api_key):
     """
     Returns a list of model names that support content generation.
     """
     try:
+        genai = _genai()
         genai.configure(api_key=api_key)
         models = [m.name.split('/')[-1] for m in genai.list_models() 
                   if 'generateContent' in m.supported_generation_methods]
@@ -66,3 +406,88 @@ def format_data_for_llm(df, ratios_df):
     summary += "\n\nCALCULATED FINANCIAL RATIOS:\n"
     summary += ratios_df.to_string()
     return summary
+
+# Rough characters-per-token ratio for Gemini on English/numeric text, used for budgeting
+CHARS_PER_TOKEN = 4
+DEFAULT_TOKEN_BUDGET = 1500
+
+# Ratios that add little the model can't infer from the others; shed first when over budget
+LOW_VALUE_RATIOS = ['Cash Runway (Months)', 'Liabilities-to-Equity', 'Operating Margin']
+
+# Ratios that are currency amounts and get scaled like the statement values
+AMOUNT_RATIOS = ['Free Cash Flow']
+
+# (divisor, label) pairs, largest first. Values are divided in whatever units the filing
+# reported them (often already thousands or millions of a currency), so the labels only
+# say how much they were scaled, never the currency unit
+VALUE_SCALES = [(1e9, 'billions of reported units'), (1e6, 'millions of reported units'),
+                (1e3, 'thousands of reported units')]
+
+def estimate_tokens(text):
+    """
+    Approximate token count of text.
+    """
+    return -(-len(text) // CHARS_PER_TOKEN)
+
+def _compact_number(value, divisor=1):
+    """
+    Rounds to 4 significant digits after scaling; missing values become empty fields.
+    """
+    if pd.isna(value):
+        return ''
+    return f"{value / divisor:.4g}"
+
+def _compact_table(frame, label, years, divisors):
+    """
+    Dense CSV with one row per column of frame (line item or ratio) and one field per year.
+    Columns with no values in the selected years are left out.
+    """
+    lines = [','.join([label, *(str(year) for year in years)])]
+    for column in frame.columns:
+        values = frame[column].reindex(years)
+        if values.isna().all():
+            continue
+        divisor = divisors.get(column, 1)
+        lines.append(','.join([str(column), *(_compact_number(v, divisor) for v in values)]))
+    return '\n'.join(lines)
+
+def _encode_compact(df, ratios_df, years):
+    peak = df.reindex(years).abs().max().max() if len(df.columns) else 0
+    divisor, unit = next(((d, u) for d, u in VALUE_SCALES if peak >= d * 10), (1, 'reported units'))
+    scale_note = f"{unit}, i.e. the filing's figures divided by {divisor:,.0f}" if divisor > 1 else unit
+    summary = f"FINANCIAL STATEMENT DATA ({scale_note}):\n"
+    summary += _compact_table(df, 'item', years, {column: divisor for column in df.columns})
+    summary += f"\n\nCALCULATED FINANCIAL RATIOS (margins, growth and ROE in %; amounts in {unit}):\n"
+    summary += _compact_table(ratios_df, 'ratio', years, {column: divisor for column in AMOUNT_RATIOS})
+    return summary
+
+def format_compact_data_for_llm(df, ratios_df, token_budget=DEFAULT_TOKEN_BUDGET, max_years=None,
+                                drop_low_value_ratios=False, report=None):
+    """
+    Token-lean alternative to format_data_for_llm: scaled statement values and ratios rounded
+    to 4 significant digits in a dense CSV layout. max_years keeps only the most recent years
+    and drop_low_value_ratios removes LOW_VALUE_RATIOS up front. If the payload is still over
+    token_budget, low-value ratios and then the oldest years (down to two) are dropped.
+    Pass a dict as report to get tokens_before/tokens_after and what was dropped.
+    """
+    years = list(df.index)
+    if max_years:
+        years = years[-max_years:]
+    ratios = ratios_df
+    if drop_low_value_ratios:
+        ratios = ratios.drop(columns=[c for c in LOW_VALUE_RATIOS if c in ratios.columns])
+
+    summary = _encode_compact(df, ratios, years)
+    if estimate_tokens(summary) > token_budget:
+        ratios = ratios.drop(columns=[c for c in LOW_VALUE_RATIOS if c in ratios.columns])
+        summary = _encode_compact(df, ratios, years)
+    while estimate_tokens(summary) > token_budget and len(years) > 2:
+        years = years[1:]
+        summary = _encode_compact(df, ratios, years)
+
+    if report is not None:
+        report['tokens_before'] = estimate_tokens(format_data_for_llm(df, ratios_df))
+        report['tokens_after'] = estimate_tokens(summary)
+        report['years_dropped'] = [str(y) for y in df.index if y not in years]
+        report['ratios_dropped'] = [c for c in ratios_df.columns if c not in ratios.columns]
+    return summary
@@ -1,33 +1,678 @@
-import pdfplumber
 import pandas as pd
+import numpy as np
+import bisect
+import gc
 import io
+import multiprocessing
+import os
+import re
+import tempfile
+import time
+from contextlib import contextmanager
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeout
+from concurrent.futures.process import BrokenProcessPool
+from data_processing import FINANCIAL_MAPPING, LINE_ITEM_PATTERNS, match_line_items, merge_table
+from perf import current_rss_bytes
 
-def extract_tables_from_pdf(pdf_file):
+# Below this many pages the cost of spinning up worker processes outweighs the gain
+MIN_PAGES_FOR_PARALLEL = 8
+
+# Parallel runs hand out page ranges of at most this many pages, so progress is reported
+# (and cancellation noticed) every few pages, and fast ranges don't wait on slow ones
+PARALLEL_CHUNK_PAGES = 8
+
+# How often a parallel run waiting on a worker checks whether it has been cancelled
+CANCEL_POLL_SECONDS = 0.1
+
+# In low-memory mode, the document is reopened when RSS passes the ceiling, but never
+# more often than every this many pages (reopening re-reads the page tree)
+MIN_PAGES_BETWEEN_REOPENS = 10
+
+# Pages scoring below this in score_page are treated as prose and never table-scanned
+PRESCREEN_MIN_SCORE = 1.0
+
+# Aliases with whitespace removed, so they can be matched against raw page characters
+_COMPACT_ALIASES = {
+    key: [re.sub(r'\s+', '', alias) for alias in aliases]
+    for key, aliases in FINANCIAL_MAPPING.items()
+}
+_YEAR_PATTERN = re.compile(r'20\d{2}')
+
+# Text-layout fallback: words within this many points vertically share a line, and with a
+# single year column, amounts further than this from its header belong to no year
+LAYOUT_LINE_TOLERANCE = 3
+LAYOUT_SINGLE_COLUMN_TOLERANCE = 50
+
+# How the text-layout parser classifies each word
+_LAYOUT_YEAR = r'20\d{2}'
+_LAYOUT_AMOUNT = r'\(?[-–—]?[$€£]?\d[\d,]*(?:\.\d+)?\)?%?|[-–—]'
+_LAYOUT_CURRENCY = r'[$€£]'
+
+# Compiled once for PdfText's per-line keyword index
+_LINE_ITEM_REGEXES = {key: re.compile(pattern) for key, pattern in LINE_ITEM_PATTERNS.items()}
+
+def _table_to_dataframe(table):
+    """
+    Turns a raw pdfplumber table (list of rows) into a cleaned DataFrame, or None if empty.
+    """
+    if not table:
+        return None
+    # Clean the table data
+    df = pd.DataFrame(table[1:], columns=table[0])
+    # Remove empty columns and rows
+    df = df.dropna(how='all', axis=0).dropna(how='all', axis=1)
+    if df.empty:
+        return None
+    return df
+
+def _pdf_source(pdf_file):
+    """
+    Returns something every worker process can open on its own: a path or the raw bytes.
+    """
+    if isinstance(pdf_file, (str, os.PathLike, bytes)):
+        return pdf_file
+    if hasattr(pdf_file, 'getvalue'):
+        return pdf_file.getvalue()
+    pdf_file.seek(0)
+    return pdf_file.read()
+
+def _open_pdf(source):
+    """
+    Opens a path, file-like object or raw bytes with pdfplumber.
+    """
+    # Imported on first use: pdfplumber/pdfminer are slow to load and CSV/XLSX runs never need them
+    import pdfplumber
+    if isinstance(source, bytes):
+        return pdfplumber.open(io.BytesIO(source))
+    return pdfplumber.open(source)
+
+class _OpenPdf:
+    """
+    An open PDF whose pages can be walked in several passes (e.g. the page ranges one
+    parallel worker is handed) without reopening the document for each.
+
+    pdfplumber keeps every page's parsed objects alive until the document is closed. In
+    low_memory mode each page is closed (dropping those caches) as soon as the caller
+    moves on to the next one. With memory_ceiling (bytes) also set, the whole document
+    is reopened whenever the process RSS is above it, releasing what pdfminer itself has
+    cached. Reopening needs a path or bytes as source (see _pdf_source).
+    """
+
+    def __init__(self, source, low_memory=False, memory_ceiling=None):
+        self.source = source
+        self.low_memory = low_memory
+        self.memory_ceiling = memory_ceiling
+        self.pdf = _open_pdf(source)
+        self._since_reopen = 0
+
+    def __len__(self):
+        return len(self.pdf.pages)
+
+    def pages(self, start=0, stop=None):
+        """
+        Iterates (page_number, page) over pages[start:stop] with 1-based page numbers.
+        """
+        n_pages = len(self)
+        for index in range(start, n_pages if stop is None else min(stop, n_pages)):
+            page = self.pdf.pages[index]
+            yield index + 1, page
+            if not self.low_memory:
+                continue
+            page.close()
+            self._since_reopen += 1
+            if self.memory_ceiling and self._since_reopen >= MIN_PAGES_BETWEEN_REOPENS:
+                rss = current_rss_bytes()
+                if rss is not None and rss > self.memory_ceiling:
+                    self.pdf.close()
+                    gc.collect()
+                    self.pdf = _open_pdf(self.source)
+                    self._since_reopen = 0
+
+    def close(self):
+        self.pdf.close()
+
+@contextmanager
+def _open_pages(source, start=0, stop=None, low_memory=False, memory_ceiling=None):
+    """
+    Opens source and yields (n_pages, pages), where pages iterates (page_number, page)
+    over pages[start:stop] with 1-based page numbers. See _OpenPdf for low_memory and
+    memory_ceiling.
+    """
+    pdf = _OpenPdf(source, low_memory, memory_ceiling)
+    try:
+        yield len(pdf), pdf.pages(start, stop)
+    finally:
+        pdf.close()
+
+def score_page(page, chars=None):
+    """
+    Cheap estimate of whether a page can hold a financial statement table, computed from
+    its characters only (no table finding). Line items matched against FINANCIAL_MAPPING
+    and distinct year headers (capped at 3) are summed and weighted by the page's digit
+    density. Pages with no recognisable line item score 0, since normalize_dataframe
+    could not extract anything from them anyway.
+    """
+    if chars is None:
+        chars = page.chars
+    text = ''.join(char['text'] for char in chars).lower()
+    text = re.sub(r'\s+', '', text)
+    if not text:
+        return 0.0
+
+    items_found = sum(
+        1 for aliases in _COMPACT_ALIASES.values()
+        if any(alias in text for alias in aliases)
+    )
+    if not items_found:
+        return 0.0
+
+    years_found = min(len(set(_YEAR_PATTERN.findall(text))), 3)
+    digit_density = sum(c.isdigit() for c in text) / len(text)
+    return (items_found + years_found) * digit_density * 10
+
+def _new_screen_stats():
+    return {
+        'pages_scanned': 0,
+        'pages_skipped': 0,
+        'parse_seconds': 0.0,
+        'screen_seconds': 0.0,
+        'table_seconds': 0.0,
+        'seconds_saved': 0.0,
+    }
+
+def _update_seconds_saved(stats):
+    """
+    Parsing the page's characters is paid with or without the pre-screen, so the saving is
+    the table detection skipped pages didn't run (at the average cost measured on scanned
+    pages) minus the time spent scoring.
+    """
+    scanned = stats['pages_scanned']
+    avg_table_seconds = stats['table_seconds'] / scanned if scanned else 0.0
+    stats['seconds_saved'] = stats['pages_skipped'] * avg_table_seconds - stats['screen_seconds']
+
+def _merge_screen_stats(stats, part):
+    for key in ('pages_scanned', 'pages_skipped', 'parse_seconds', 'screen_seconds', 'table_seconds'):
+        stats[key] += part[key]
+    _update_seconds_saved(stats)
+
+def _page_tables(page, min_score=None, stats=None):
+    """
+    Returns the non-empty tables on one page as DataFrames. With min_score set, a page
+    scoring below it is skipped without running table detection; stats (see
+    _new_screen_stats) is updated either way.
+    """
+    if stats is None:
+        stats = _new_screen_stats()
+    if min_score is not None:
+        t0 = time.perf_counter()
+        chars = page.chars
+        t1 = time.perf_counter()
+        skip = score_page(page, chars) < min_score
+        stats['parse_seconds'] += t1 - t0
+        stats['screen_seconds'] += time.perf_counter() - t1
+        if skip:
+            stats['pages_skipped'] += 1
+            _update_seconds_saved(stats)
+            return []
+
+    t0 = time.perf_counter()
+    tables = page.extract_tables()
+    stats['table_seconds'] += time.perf_counter() - t0
+    stats['pages_scanned'] += 1
+    _update_seconds_saved(stats)
+
+    frames = (_table_to_dataframe(table) for table in tables)
+    return [df for df in frames if df is not None]
+
+def _iter_page_tables(pages, min_score=None, stats=None, on_page=None, cancel=None):
+    """
+    Yields (page_number, DataFrame) for every non-empty table on the (page_number, page)
+    pairs from _open_pages. on_page(page_number) is called as each page finishes, and
+    iteration stops before the next page once cancel (a threading.Event) is set.
+    """
+    for page_number, page in pages:
+        if cancel is not None and cancel.is_set():
+            return
+        tables = _page_tables(page, min_score, stats)
+        if on_page is not None:
+            on_page(page_number)
+        for df in tables:
+            yield page_number, df
+
+# The document a parallel worker process parses its page ranges from, set by _init_page_worker
+_WORKER = {}
+
+def _init_page_worker(source, memory_ceiling=None):
+    """
+    Pool initializer: opens the PDF once per worker process, so the source is shipped and
+    the page tree read once per worker rather than once per page range.
+    """
+    # A worker never revisits a page, so each is closed once its tables are taken
+    _WORKER['pdf'] = _OpenPdf(source, low_memory=True, memory_ceiling=memory_ceiling)
+
+def _extract_page_range(start, stop, min_score=None):
+    """
+    Worker: extracts tables from pages[start:stop] of the document _init_page_worker
+    opened. Returns the tables and the pre-screen stats for the range.
+    """
+    stats = _new_screen_stats()
+    return list(_iter_page_tables(_WORKER['pdf'].pages(start, stop), min_score, stats)), stats
+
+@contextmanager
+def _shared_source(source):
+    """
+    Yields a path every worker process can open: source itself, or raw bytes written once
+    to a temporary file, which is removed afterwards.
+    """
+    if not isinstance(source, bytes):
+        yield source
+        return
+    fd, path = tempfile.mkstemp(suffix='.pdf')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(source)
+        yield path
+    finally:
+        try:
+            os.remove(path)
+        except OSError:
+            # Windows won't delete it while a cancelled worker still has it open
+            pass
+
+def _wait_for(future, cancel=None):
+    """
+    future.result(), but returns None as soon as cancel is set instead of blocking.
+    """
+    if cancel is None:
+        return future.result()
+    while not cancel.is_set():
+        try:
+            return future.result(timeout=CANCEL_POLL_SECONDS)
+        except FutureTimeout:
+            continue
+    return None
+
+def pool_context():
+    """
+    multiprocessing context for worker pools: forkserver where the platform has it, else
+    spawn. Pools are started from threads (the Streamlit server, ExtractionJob), and a
+    plain fork there can copy a lock another thread holds into the child, deadlocking it.
+    """
+    method = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+    return multiprocessing.get_context(method)
+
+def _page_ranges(n_pages, n_chunks):
+    """
+    Splits range(n_pages) into at most n_chunks contiguous (start, stop) ranges.
+    """
+    n_chunks = max(1, min(n_chunks, n_pages))
+    size, extra = divmod(n_pages, n_chunks)
+    ranges = []
+    start = 0
+    for i in range(n_chunks):
+        stop = start + size + (1 if i < extra else 0)
+        ranges.append((start, stop))
+        start = stop
+    return ranges
+
+def iter_tables_from_pdf(pdf_file, parallel=False, max_workers=None,
+                         prescreen=False, min_score=PRESCREEN_MIN_SCORE, stats=None,
+                         progress=None, cancel=None, low_memory=False, memory_ceiling=None):
+    """
+    Generator variant of extract_tables_from_pdf: yields (page_number, DataFrame) one table
+    at a time, in page order, so callers can start normalizing before the whole document
+    has been parsed.
+
+    With parallel=True the pages are split into contiguous ranges and parsed across a
+    process pool (max_workers processes, default os.cpu_count()). Small documents, or
+    environments where a process pool can't be started, fall back to the serial path.
+
+    With prescreen=True each page is first scored with score_page and pages below
+    min_score are skipped without running table detection. Pass a dict as stats to get
+    pages_scanned, pages_skipped, parse_seconds, screen_seconds, table_seconds and
+    seconds_saved back.
+
+    progress(pages_done, total_pages) is called once the page count is known and then as
+    pages finish (every page when serial, every completed page range when parallel). If cancel (a threading.Event) is set, the
+    generator stops at the next page or range boundary without raising.
+
+    low_memory=True releases each page's parsed objects as soon as its tables are taken,
+    so peak memory stays roughly flat however long the document is; memory_ceiling
+    (bytes of RSS, per process) additionally reopens the document whenever it's exceeded,
+    and implies low_memory. Parallel workers always release pages as they go, since each
+    keeps its document open across the page ranges it is handed.
+    """
+    if stats is None:
+        stats = {}
+    stats.update(_new_screen_stats())
+    min_score = min_score if prescreen else None
+    low_memory = low_memory or memory_ceiling is not None
+
+    def serial(source, start=0):
+        with _open_pages(source, start, None, low_memory, memory_ceiling) as (n_pages, pages):
+            on_page = None
+            if progress is not None:
+                progress(start, n_pages)
+                on_page = lambda page_number: progress(page_number, n_pages)
+            yield from _iter_page_tables(pages, min_score, stats, on_page, cancel)
+
+    if not parallel:
+        # Reopening under a memory ceiling needs something that can be opened again
+        yield from serial(_pdf_source(pdf_file) if memory_ceiling is not None else pdf_file)
+        return
+
+    source = _pdf_source(pdf_file)
+    with _open_pdf(source) as pdf:
+        n_pages = len(pdf.pages)
+
+    if progress is not None:
+        progress(0, n_pages)
+
+    workers = max_workers or os.cpu_count() or 1
+    if workers < 2 or n_pages < MIN_PAGES_FOR_PARALLEL:
+        yield from serial(source)
+        return
+
+    ranges = _page_ranges(n_pages, max(workers, -(-n_pages // PARALLEL_CHUNK_PAGES)))
+    n = len(ranges)
+    executor = None
+    done = 0
+    cancelled = False
+    with _shared_source(source) as shared:
+        try:
+            # Each worker opens the document once (see _init_page_worker); tasks only carry page numbers
+            executor = ProcessPoolExecutor(max_workers=min(workers, n), mp_context=pool_context(),
+                                           initializer=_init_page_worker, initargs=(shared, memory_ceiling))
+            futures = [executor.submit(_extract_page_range, start, stop, min_score) for start, stop in ranges]
+            # Results are consumed in submission order, so page order is preserved
+            for (start, stop), future in zip(ranges, futures):
+                result = _wait_for(future, cancel)
+                if result is None:
+                    cancelled = True
+                    return
+                chunk, chunk_stats = result
+                _merge_screen_stats(stats, chunk_stats)
+                if progress is not None:
+                    progress(stop, n_pages)
+                yield from chunk
+                done = stop
+        except (BrokenProcessPool, OSError):
+            # Pool couldn't start or a worker died: finish serially from where we stopped
+            yield from serial(source, done)
+        finally:
+            if executor is not None:
+                # On cancel, don't wait for ranges already running in the workers
+                executor.shutdown(wait=not cancelled, cancel_futures=True)
+
+def extract_tables_from_pdf(pdf_file, parallel=False, max_workers=None,
+                            prescreen=False, min_score=PRESCREEN_MIN_SCORE, stats=None,
+                            progress=None, cancel=None, low_memory=False, memory_ceiling=None):
     """
     Extracts all tables from a PDF file and returns a list of Pandas DataFrames.
+    Tables are returned in page order; see iter_tables_from_pdf for the options.
+    """
+    tables = iter_tables_from_pdf(pdf_file, parallel=parallel, max_workers=max_workers,
+                                  prescreen=prescreen, min_score=min_score, stats=stats,
+                                  progress=progress, cancel=cancel, low_memory=low_memory,
+                                  memory_ceiling=memory_ceiling)
+    return [df for _, df in tables]
+
+class PdfText:
     """
-    all_dataframes = []
-    
-    with pdfplumber.open(pdf_file) as pdf:
-        for page in pdf.pages:
-            tables = page.extract_tables()
-            for table in tables:
-                if table:
-                    # Clean the table data
-                    df = pd.DataFrame(table[1:], columns=table[0])
-                    # Remove empty columns and rows
-                    df = df.dropna(how='all', axis=0).dropna(how='all', axis=1)
-                    if not df.empty:
-                        all_dataframes.append(df)
-    
-    return all_dataframes
-
-def simple_pdf_text_extraction(pdf_file):
+    Text of a PDF built up one page at a time: the pages are written into a single buffer
+    (with a newline between pages) and their start offsets recorded, while every line is
+    checked against FINANCIAL_MAPPING. The resulting inverted index maps each
+    standardized key and each alias to the (page, line) positions mentioning it, both
+    1-based, so lookups don't rescan the text.
+    """
+
+    def __init__(self):
+        self.page_offsets = []
+        self._buffer = io.StringIO()
+        self._text = None
+        self._index = {}
+
+    def add_page(self, page_text):
+        if self.page_offsets:
+            self._buffer.write('\n')
+        self.page_offsets.append(self._buffer.tell())
+        self._buffer.write(page_text)
+        self._text = None
+
+        page_number = len(self.page_offsets)
+        for line_number, line in enumerate(page_text.lower().splitlines(), start=1):
+            # Some keys are also aliases ('revenue', 'equity'), so collect terms once per line
+            terms = {}
+            for key, pattern in _LINE_ITEM_REGEXES.items():
+                if pattern.search(line):
+                    terms[key] = None
+                    terms.update((alias, None) for alias in FINANCIAL_MAPPING[key] if alias in line)
+            for term in terms:
+                self._index.setdefault(term, []).append((page_number, line_number))
+
+    @property
+    def text(self):
+        if self._text is None:
+            self._text = self._buffer.getvalue()
+        return self._text
+
+    @property
+    def n_pages(self):
+        return len(self.page_offsets)
+
+    def page_text(self, page_number):
+        start = self.page_offsets[page_number - 1]
+        if page_number < self.n_pages:
+            return self.text[start:self.page_offsets[page_number] - 1]
+        return self.text[start:]
+
+    def page_at(self, offset):
+        """
+        Page number containing character offset of text.
+        """
+        return bisect.bisect_right(self.page_offsets, offset)
+
+    def positions(self, term):
+        """
+        (page, line) positions of every line mentioning term, a standardized key such as
+        'operating_cash_flow' or one of its aliases such as 'operating cash flow'.
+        Unknown terms return [].
+        """
+        return list(self._index.get(term.strip().lower(), ()))
+
+    def pages(self, term):
+        """
+        Page numbers mentioning term, in order, without repeats.
+        """
+        return list(dict.fromkeys(page for page, _ in self._index.get(term.strip().lower(), ())))
+
+def extract_pdf_text(pdf_file, low_memory=False, memory_ceiling=None, progress=None, cancel=None):
+    """
+    Streams a PDF's text page by page into a PdfText. progress, cancel, low_memory and
+    memory_ceiling work as in iter_tables_from_pdf; a cancelled run returns the pages
+    read so far.
+    """
+    if memory_ceiling is not None:
+        low_memory = True
+        pdf_file = _pdf_source(pdf_file)
+    pdf_text = PdfText()
+    with _open_pages(pdf_file, low_memory=low_memory, memory_ceiling=memory_ceiling) as (n_pages, pages):
+        if progress is not None:
+            progress(0, n_pages)
+        for page_number, page in pages:
+            if cancel is not None and cancel.is_set():
+                break
+            pdf_text.add_page(page.extract_text() or "")
+            if progress is not None:
+                progress(page_number, n_pages)
+    return pdf_text
+
+def simple_pdf_text_extraction(pdf_file, low_memory=False, memory_ceiling=None):
     """
     Fall-back if tables aren't detected perfectly: extract text and search for keywords.
+    Pages are separated by a newline; use extract_pdf_text for page offsets and a
+    keyword index.
+    """
+    return extract_pdf_text(pdf_file, low_memory=low_memory, memory_ceiling=memory_ceiling).text
+
+def _page_words(page, x_tolerance=3, y_tolerance=3):
+    """
+    The page's words as {text, x0, x1, top} dicts, like pdfplumber's extract_words, but
+    built straight from pdfminer's layout characters: converting every character into a
+    page.chars dict is most of extract_words' cost, and only positions are needed here.
+    """
+    from pdfminer.layout import LTChar, LTContainer
+
+    chars = []
+    stack = list(page.layout)
+    while stack:
+        obj = stack.pop()
+        if isinstance(obj, LTChar):
+            chars.append((page.height - obj.y1, obj.x0, obj.x1, obj.get_text()))
+        elif isinstance(obj, LTContainer):
+            # Form XObjects (LTFigure) can hold text too
+            stack.extend(obj)
+    chars.sort()
+
+    # Chars are sorted by top, so a line ends where the top jumps; within a line, a
+    # word ends at whitespace or a horizontal gap
+    lines = []
+    for char in chars:
+        if lines and char[0] - lines[-1][0][0] <= y_tolerance:
+            lines[-1].append(char)
+        else:
+            lines.append([char])
+    words = []
+    for line in lines:
+        top = line[0][0]
+        word = None
+        for _, x0, x1, text in sorted(line, key=lambda char: char[1]):
+            if text.isspace():
+                word = None
+                continue
+            if word is not None and x0 - word['x1'] <= x_tolerance:
+                word['text'] += text
+                word['x1'] = x1
+            else:
+                word = {'text': text, 'x0': x0, 'x1': x1, 'top': top}
+                words.append(word)
+    return words
+
+def layout_tables(words, line_tolerance=LAYOUT_LINE_TOLERANCE):
+    """
+    Rebuilds statement tables from positioned words (dicts with text, x0, x1 and top, as
+    from pdfplumber's extract_words), for statements laid out as plain text with no
+    ruling for table detection to find.
+
+    Words are grouped into lines by their top. A line whose trailing words are all years
+    (and whose label isn't a line item) starts a table; each following line that ends in
+    amounts is a row, its amounts assigned to the nearest year column by horizontal
+    centre. Returns one DataFrame per year header, with the label column first and the
+    raw cell strings under each year, the same shape extract_tables_from_pdf yields.
+    """
+    if not words:
+        return []
+    w = pd.DataFrame(words, columns=['text', 'x0', 'x1', 'top'])
+    w['text'] = w['text'].astype(str)
+    is_year = w['text'].str.fullmatch(_LAYOUT_YEAR).to_numpy(dtype=bool)
+    if not is_year.any():
+        return []
+    w = w.sort_values(['top', 'x0'], kind='stable').reset_index(drop=True)
+    line_ids = (w['top'].diff() > line_tolerance).cumsum()
+    w = w.assign(line=line_ids).sort_values(['line', 'x0'], kind='stable').reset_index(drop=True)
+
+    # Classify every word at once; the per-line loop below only slices the results
+    text = w['text']
+    kinds = np.select(
+        [text.str.fullmatch(_LAYOUT_YEAR).to_numpy(dtype=bool),
+         text.str.fullmatch(_LAYOUT_AMOUNT).to_numpy(dtype=bool),
+         text.str.fullmatch(_LAYOUT_CURRENCY).to_numpy(dtype=bool)],
+        ['year', 'amount', 'currency'], default='label').tolist()
+    texts = text.tolist()
+    centers = ((w['x0'] + w['x1']) / 2).to_numpy()
+    line = w['line'].to_numpy()
+    bounds = np.flatnonzero(np.diff(line)) + 1
+    starts = [0, *bounds.tolist()]
+    ends = [*bounds.tolist(), len(line)]
+
+    tables = []
+    header = None
+    rows = []
+
+    def flush():
+        if header is not None and rows:
+            tables.append(pd.DataFrame(rows, columns=['Line Item', *header[0]]))
+
+    for start, end in zip(starts, ends):
+        # The label is everything up to the line's last label word; the rest are cells
+        cut = start
+        for i in range(end - 1, start - 1, -1):
+            if kinds[i] == 'label':
+                cut = i + 1
+                break
+        cells = [i for i in range(cut, end) if kinds[i] != 'currency']
+        if not cells:
+            continue
+        label = ' '.join(texts[start:cut])
+        if all(kinds[i] == 'year' for i in cells) and not match_line_items([label]):
+            flush()
+            header_centers = centers[cells]
+            gaps = np.diff(header_centers)
+            tolerance = gaps.min() / 2 if len(gaps) else LAYOUT_SINGLE_COLUMN_TOLERANCE
+            header = ([texts[i] for i in cells], header_centers, tolerance)
+            rows = []
+            continue
+        if header is None or not label:
+            continue
+
+        years, header_centers, tolerance = header
+        distance = np.abs(centers[cells][:, None] - header_centers[None, :])
+        row = [label] + [None] * len(years)
+        for i, column, off in zip(cells, distance.argmin(axis=1), distance.min(axis=1)):
+            # The first amount under a column wins; stray numbers between columns are dropped
+            if off <= tolerance and row[column + 1] is None:
+                row[column + 1] = texts[i]
+        if any(cell is not None for cell in row[1:]):
+            rows.append(row)
+    flush()
+    return tables
+
+def layout_line_items(words):
+    """
+    The text-layout counterpart of normalize_dataframe for one page's words:
+    {standardized_key: {year: value}}, merged over the page's tables.
+    """
+    master_data = {}
+    for df in layout_tables(words):
+        merge_table(master_data, df)
+    return master_data
+
+def iter_layout_tables_from_pdf(pdf_file, progress=None, cancel=None, low_memory=False, memory_ceiling=None):
+    """
+    Fallback for PDFs where extract_tables_from_pdf finds nothing: yields
+    (page_number, DataFrame) from layout_tables run on each page's words. This needs
+    only character positions, no table finding or per-character attribute processing,
+    so it is much cheaper per page.
+    progress, cancel, low_memory and memory_ceiling work as in iter_tables_from_pdf.
+    """
+    if memory_ceiling is not None:
+        low_memory = True
+        pdf_file = _pdf_source(pdf_file)
+    with _open_pages(pdf_file, low_memory=low_memory, memory_ceiling=memory_ceiling) as (n_pages, pages):
+        if progress is not None:
+            progress(0, n_pages)
+        for page_number, page in pages:
+            if cancel is not None and cancel.is_set():
+                return
+            for df in layout_tables(_page_words(page)):
+                yield page_number, df
+            if progress is not None:
+                progress(page_number, n_pages)
+
+def extract_layout_tables_from_pdf(pdf_file, progress=None, cancel=None, low_memory=False, memory_ceiling=None):
+    """
+    List variant of iter_layout_tables_from_pdf.
     """
-    text = ""
-    with pdfplumber.open(pdf_file) as pdf:
-        for page in pdf.pages:
-            text += page.extract_text() or ""
-    return text
+    tables = iter_layout_tables_from_pdf(pdf_file, progress=progress, cancel=cancel, low_memory=low_memory,
+                                         memory_ceiling=memory_ceiling)
+    return [df for _, df in tables]
@@ -0,0 +1,144 @@
+"""
+Lightweight per-stage instrumentation: wall time, peak RSS growth and counts (pages,
+tables, rows, tokens...) for each span, exportable as JSON or Prometheus text.
+"""
+import json
+import os
+import sys
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager, nullcontext
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+METRIC_PREFIX = "fin_analyzer"
+
+def max_rss_bytes():
+    """
+    Peak resident set size of the process so far, or 0 where it can't be read.
+    """
+    if resource is None:
+        return 0
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return rss if sys.platform == 'darwin' else rss * 1024
+
+def current_rss_bytes():
+    """
+    Current resident set size of the process from /proc/self/statm, or None where that
+    isn't available (non-Linux).
+    """
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError, AttributeError):
+        return None
+
+class PerfRecorder:
+    """
+    Collects spans from any thread. Each span records its wall time, how much the
+    process's peak RSS grew while it ran (0 if it stayed under an earlier peak) and
+    whatever counts the caller adds. Only the last max_spans spans are kept.
+    """
+
+    def __init__(self, max_spans=500):
+        self.spans = deque(maxlen=max_spans)
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def span(self, name, **counts):
+        """
+        Times the with-block as span name. Yields the span's counts dict so the block can
+        fill in counts it only knows at the end, e.g. counts['rows'] = len(df).
+        """
+        counts = dict(counts)
+        rss_before = max_rss_bytes()
+        started_at = time.time()
+        start = time.perf_counter()
+        try:
+            yield counts
+        finally:
+            self.record(name, time.perf_counter() - start, max_rss_bytes() - rss_before,
+                        started_at=started_at, **counts)
+
+    def record(self, name, seconds, rss_delta_bytes=0, started_at=None, **counts):
+        """
+        Adds a span measured elsewhere (e.g. time reported back by worker processes).
+        """
+        with self._lock:
+            self.spans.append({
+                'name': name,
+                'started_at': started_at if started_at is not None else time.time() - seconds,
+                'seconds': seconds,
+                'rss_delta_bytes': rss_delta_bytes,
+                'counts': counts,
+            })
+
+    def clear(self):
+        with self._lock:
+            self.spans.clear()
+
+    def summary(self):
+        """
+        Per stage, in first-seen order: number of calls, total and last wall time, the
+        largest RSS growth and the counts summed over calls.
+        """
+        with self._lock:
+            spans = list(self.spans)
+        stages = {}
+        for span in spans:
+            stage = stages.setdefault(span['name'], {'calls': 0, 'seconds': 0.0, 'last_seconds': 0.0,
+                                                     'rss_delta_bytes': 0, 'counts': {}})
+            stage['calls'] += 1
+            stage['seconds'] += span['seconds']
+            stage['last_seconds'] = span['seconds']
+            stage['rss_delta_bytes'] = max(stage['rss_delta_bytes'], span['rss_delta_bytes'])
+            for key, value in span['counts'].items():
+                stage['counts'][key] = stage['counts'].get(key, 0) + value
+        return stages
+
+    def to_json(self, indent=2):
+        with self._lock:
+            spans = list(self.spans)
+        return json.dumps({'spans': spans, 'stages': self.summary()}, indent=indent, default=str)
+
+    def to_prometheus(self, prefix=METRIC_PREFIX):
+        """
+        The per-stage summary in the Prometheus text exposition format.
+        """
+        stages = self.summary()
+        lines = []
+
+        def metric(name, help_text, kind, samples):
+            lines.append(f"# HELP {prefix}_{name} {help_text}")
+            lines.append(f"# TYPE {prefix}_{name} {kind}")
+            for labels, value in samples:
+                label_text = ','.join(f'{key}="{_escape_label(val)}"' for key, val in labels.items())
+                lines.append(f"{prefix}_{name}{{{label_text}}} {value}")
+
+        metric("stage_seconds_total", "Wall time spent in each pipeline stage.", "counter",
+               [({'stage': name}, stage['seconds']) for name, stage in stages.items()])
+        metric("stage_calls_total", "Times each pipeline stage ran.", "counter",
+               [({'stage': name}, stage['calls']) for name, stage in stages.items()])
+        metric("stage_rss_delta_bytes", "Largest peak RSS growth seen during the stage.", "gauge",
+               [({'stage': name}, stage['rss_delta_bytes']) for name, stage in stages.items()])
+        metric("stage_items_total", "Items processed by each stage (pages, tables, rows, tokens...).", "counter",
+               [({'stage': name, 'item': key}, value)
+                for name, stage in stages.items() for key, value in stage['counts'].items()])
+        return "\n".join(lines) + "\n"
+
+def _escape_label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def span(recorder, name, **counts):
+    """
+    recorder.span(name, **counts), or a no-op context yielding a throwaway counts dict
+    when recorder is None, so instrumented code doesn't need to check.
+    """
+    if recorder is None:
+        return nullcontext(dict(counts))
+    return recorder.span(name, **counts)
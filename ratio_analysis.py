@@ -1,58 +1,161 @@
 import pandas as pd
 
-def calculate_ratios(df):
+# name -> {'inputs': [...], 'formula': callable, 'unless': [...]}, in registration order
+RATIO_REGISTRY = {}
+
+def register_ratio(name, inputs, formula, unless=(), lookback=None):
+    """
+    Registers (or replaces) a ratio so calculate_ratios can compute it.
+    inputs are line-item columns or other registered ratio names. formula is called as
+    formula(values, prev): values maps each input to its Series, and prev(series) returns
+    the previous period's values (per company in panel mode). It must return a Series.
+    The ratio is skipped whenever any ratio named in unless can be computed, which is how
+    fallbacks such as Liabilities-to-Equity are expressed.
+    lookback is how many earlier periods formula itself reads through prev (0 if it never
+    calls it); ratios built on other ratios add up their lookbacks. update_ratios uses it
+    to decide how much history to recompute, and recomputes everything whenever a
+    requested ratio depends on one registered without it.
+    """
+    RATIO_REGISTRY[name] = {'inputs': list(inputs), 'formula': formula, 'unless': list(unless),
+                            'lookback': lookback}
+
+# 1. Profitability Ratios
+register_ratio('Net Profit Margin', ['net_income', 'revenue'],
+               lambda v, prev: (v['net_income'] / v['revenue']) * 100, lookback=0)
+register_ratio('Operating Margin', ['operating_income', 'revenue'],
+               lambda v, prev: (v['operating_income'] / v['revenue']) * 100, lookback=0)
+register_ratio('Revenue Growth (%)', ['revenue'],
+               lambda v, prev: (v['revenue'] / prev(v['revenue']) - 1) * 100, lookback=1)
+
+# 2. Liquidity Ratios
+register_ratio('Current Ratio', ['current_assets', 'current_liabilities'],
+               lambda v, prev: v['current_assets'] / v['current_liabilities'], lookback=0)
+
+# 3. Solvency Ratios
+register_ratio('Debt-to-Equity', ['total_debt', 'equity'],
+               lambda v, prev: v['total_debt'] / v['equity'], lookback=0)
+# Fallback if total_debt isn't explicitly found
+register_ratio('Liabilities-to-Equity', ['total_liabilities', 'equity'],
+               lambda v, prev: v['total_liabilities'] / v['equity'],
+               unless=['Debt-to-Equity'], lookback=0)
+
+# 4. Efficiency Ratios
+register_ratio('ROE (%)', ['net_income', 'equity'],
+               lambda v, prev: (v['net_income'] / v['equity']) * 100, lookback=0)
+
+# 5. Cash Flow Ratios
+# FCF = OCF - CapEx; our clean_value turns (val) into a negative, so CapEx is added
+register_ratio('Free Cash Flow', ['operating_cash_flow', 'capital_expenditure'],
+               lambda v, prev: v['operating_cash_flow'] + v['capital_expenditure'], lookback=0)
+
+# 6. Cash Runway (Simplified)
+# If operating cash flow is negative, how many months can they last with Current Assets?
+register_ratio('Cash Runway (Months)', ['operating_cash_flow', 'current_assets'],
+               lambda v, prev: (v['current_assets'] / (v['operating_cash_flow'].abs() / 12))
+               .where(v['operating_cash_flow'] < 0).astype(float), lookback=0)
+
+def _compute_ratios(df, ratios, prev):
+    """
+    Computes the requested ratios (default: every registered one) plus whatever they
+    depend on, and nothing else. Ratios whose inputs are missing are left out.
+    """
+    if ratios is None:
+        ratios = list(RATIO_REGISTRY)
+    cols = df.columns
+    available = {}
+    values = {}
+
+    def is_available(name, path=()):
+        if name in cols:
+            return True
+        if name not in available:
+            spec = RATIO_REGISTRY.get(name)
+            if spec is None:
+                return False
+            if name in path:
+                raise ValueError(f"Circular ratio dependency: {' -> '.join(path + (name,))}")
+            path = path + (name,)
+            available[name] = (
+                all(is_available(dep, path) for dep in spec['inputs'])
+                and not any(is_available(other, path) for other in spec['unless'])
+            )
+        return available[name]
+
+    def value(name):
+        if name in cols:
+            return df[name]
+        if name not in values:
+            spec = RATIO_REGISTRY[name]
+            values[name] = spec['formula']({dep: value(dep) for dep in spec['inputs']}, prev)
+        return values[name]
+
+    results = {name: value(name) for name in ratios if is_available(name)}
+    return pd.DataFrame(results, index=df.index)
+
+def calculate_ratios(df, ratios=None):
     """
     Calculates financial ratios from the normalized dataframe.
     Expected columns in df: revenue, net_income, operating_income, total_assets, 
     total_liabilities, equity, current_assets, current_liabilities, 
     operating_cash_flow, capital_expenditure, total_debt.
+    Pass a list of names as ratios to compute only those (and their dependencies);
+    see register_ratio for adding new ones.
     """
-    results = {}
-    
-    # Check if we have the necessary columns
-    cols = df.columns
-    
-    # 1. Profitability Ratios
-    if 'revenue' in cols and 'net_income' in cols:
-        results['Net Profit Margin'] = (df['net_income'] / df['revenue']) * 100
-        
-    if 'revenue' in cols and 'operating_income' in cols:
-        results['Operating Margin'] = (df['operating_income'] / df['revenue']) * 100
-
-    if 'revenue' in cols:
-        results['Revenue Growth (%)'] = df['revenue'].pct_change() * 100
-
-    # 2. Liquidity Ratios
-    if 'current_assets' in cols and 'current_liabilities' in cols:
-        results['Current Ratio'] = df['current_assets'] / df['current_liabilities']
-
-    # 3. Solvency Ratios
-    if 'total_debt' in cols and 'equity' in cols:
-        results['Debt-to-Equity'] = df['total_debt'] / df['equity']
-    elif 'total_liabilities' in cols and 'equity' in cols:
-        # Fallback if total_debt isn't explicitly found
-        results['Liabilities-to-Equity'] = df['total_liabilities'] / df['equity']
-
-    # 4. Efficiency Ratios
-    if 'net_income' in cols and 'equity' in cols:
-        results['ROE (%)'] = (df['net_income'] / df['equity']) * 100
-
-    # 5. Cash Flow Ratios
-    if 'operating_cash_flow' in cols and 'capital_expenditure' in cols:
-        # FCF = OCF - CapEx (CapEx is usually negative in our cleaning, or positive if extracted as absolute)
-        # We adjust based on assumption: if CapEx is negative, add it. If positive, subtract it.
-        # But our clean_value handles (val) as negative.
-        results['Free Cash Flow'] = df['operating_cash_flow'] + df['capital_expenditure']
-    
-    # 6. Cash Runway (Simplified)
-    # If operating cash flow is negative, how many months can they last with Current Assets?
-    if 'operating_cash_flow' in cols and 'current_assets' in cols:
-        def calc_runway(row):
-            if row['operating_cash_flow'] < 0:
-                burn_rate = abs(row['operating_cash_flow']) / 12  # monthly burn
-                return row['current_assets'] / burn_rate if burn_rate > 0 else float('inf')
-            return float('nan')
-        
-        results['Cash Runway (Months)'] = df.apply(calc_runway, axis=1)
-
-    return pd.DataFrame(results)
+    return _compute_ratios(df, ratios, lambda series: series.shift())
+
+def calculate_panel_ratios(panel, ratios=None):
+    """
+    Panel variant of calculate_ratios for many companies at once.
+    panel is indexed by a (company, year) MultiIndex, e.g. pd.concat({name: df, ...}).
+    Every ratio is computed in a single vectorized pass over all companies; growth uses
+    per-company shifts so one company's last year never feeds the next company's first.
+    Rows come back sorted by (company, year).
+    """
+    panel = panel.sort_index()
+    return _compute_ratios(panel, ratios, lambda series: series.groupby(level=0).shift())
+
+def _lookback(names, path=()):
+    """
+    How many earlier periods computing names reads, through every ratio they depend on,
+    or None if some ratio involved was registered without a lookback (or in a cycle).
+    """
+    longest = 0
+    for name in names:
+        spec = RATIO_REGISTRY.get(name)
+        if spec is None:
+            continue
+        if name in path or spec['lookback'] is None:
+            return None
+        inputs = _lookback(spec['inputs'], path + (name,))
+        if inputs is None:
+            return None
+        longest = max(longest, spec['lookback'] + inputs)
+    return longest
+
+def update_ratios(prev_df, prev_ratios, new_df, ratios=None):
+    """
+    Incremental calculate_ratios for when new periods arrive for a company already tracked.
+    prev_df/prev_ratios are the earlier normalized frame and its ratios; new_df holds the
+    new (or restated) periods. Returns (df, ratios_df), equal to merging the frames and
+    running calculate_ratios over the whole history.
+
+    Only the rows from the earliest new period onwards are recomputed, with as many earlier
+    rows kept as the requested ratios look back (see register_ratio). If the new periods
+    bring line items prev_df didn't have, the set of computable ratios can change for
+    every year, so everything is recomputed; so it is when a requested ratio's lookback
+    isn't known.
+    """
+    df = new_df.combine_first(prev_df).sort_index()
+    first = df.index.get_indexer(new_df.index).min() if len(new_df) else len(df)
+    lookback = _lookback(list(RATIO_REGISTRY) if ratios is None else ratios)
+
+    if (lookback is None or set(df.columns) != set(prev_df.columns)
+            or not prev_ratios.index.equals(prev_df.index)
+            or not df.index[:first].equals(prev_df.index[:first])):
+        return df, calculate_ratios(df, ratios)
+
+    start = max(first - lookback, 0)
+    tail = calculate_ratios(df.iloc[start:], ratios).iloc[first - start:]
+    if not tail.columns.equals(prev_ratios.columns):
+        return df, calculate_ratios(df, ratios)
+    return df, pd.concat([prev_ratios.iloc[:first], tail])
@@ -0,0 +1,43 @@
+import json
+import multiprocessing
+import os
+import pandas as pd
+import pytest
+import batch_analyze
+
+STATEMENT = "Line Item,2023,2024\nRevenue,{revenue},{growth}\nNet Income,10,12\nTotal Assets,500,520\n"
+
+def _crash_on_bad_files(analyze_file):
+    def analyze(path):
+        if os.path.basename(path).startswith('crash'):
+            # What a segfault or the OOM killer inside a PDF library looks like to the pool
+            os._exit(1)
+        return analyze_file(path)
+    return analyze
+
+@pytest.mark.skipif(multiprocessing.get_start_method() != 'fork',
+                    reason="the crashing analyze_file is patched into forked workers")
+def test_crashing_file_doesnt_take_down_the_rest(tmp_path, monkeypatch):
+    monkeypatch.setattr(batch_analyze, 'analyze_file', _crash_on_bad_files(batch_analyze.analyze_file))
+    inputs = tmp_path / 'filings'
+    inputs.mkdir()
+    good = []
+    for i in range(7):
+        path = inputs / f"{i}.csv"
+        path.write_text(STATEMENT.format(revenue=100 + i, growth=110 + i))
+        good.append(str(path))
+    (inputs / 'crash.csv').write_text(STATEMENT.format(revenue=1, growth=2))
+    out = tmp_path / 'out'
+
+    succeeded, failed, skipped = batch_analyze.run_batch([str(inputs)], str(out), workers=2, fmt='csv')
+
+    assert (succeeded, failed, skipped) == (7, 1, 0)
+    errors = [json.loads(line) for line in (out / batch_analyze.ERRORS_NAME).read_text().splitlines()]
+    assert [os.path.basename(e['file']) for e in errors] == ['crash.csv']
+    assert errors[0]['error'].startswith("Worker crashed")
+    rows = pd.read_csv(out / f"{batch_analyze.OUTPUT_STEM}.csv")
+    assert sorted(rows['file'].unique()) == sorted(good)
+    assert len(rows) == 2 * len(good)
+
+    # The crashed file isn't in the manifest, so a resumed run retries only it
+    assert batch_analyze.run_batch([str(inputs)], str(out), workers=2, fmt='csv') == (0, 1, 7)
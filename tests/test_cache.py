@@ -0,0 +1,37 @@
+import threading
+import pandas as pd
+import pytest
+import cache
+from cache import ParsedFrameCache
+from utils import get_demo_data
+
+pytestmark = pytest.mark.skipif(not cache.PARQUET_AVAILABLE, reason="the disk layer needs pyarrow")
+
+def test_round_trip_survives_a_new_process_cache(tmp_path):
+    df = get_demo_data()
+    ParsedFrameCache(str(tmp_path)).put('key', df)
+
+    pd.testing.assert_frame_equal(ParsedFrameCache(str(tmp_path)).get('key'), df)
+
+def test_concurrent_puts_of_one_key_write_separate_temp_files(tmp_path, monkeypatch):
+    df = get_demo_data()
+    parse_cache = ParsedFrameCache(str(tmp_path))
+    # Hold both sessions inside the Parquet write at the same time
+    both_writing = threading.Barrier(2, timeout=10)
+    temp_paths = []
+    to_parquet = pd.DataFrame.to_parquet
+    def racing_to_parquet(frame, path, *args, **kwargs):
+        temp_paths.append(path)
+        both_writing.wait()
+        return to_parquet(frame, path, *args, **kwargs)
+    monkeypatch.setattr(pd.DataFrame, 'to_parquet', racing_to_parquet)
+
+    sessions = [threading.Thread(target=parse_cache.put, args=('key', df)) for _ in range(2)]
+    for session in sessions:
+        session.start()
+    for session in sessions:
+        session.join()
+
+    assert len(set(temp_paths)) == 2
+    assert sorted(p.name for p in (tmp_path / 'parsed').iterdir()) == ['key.parquet']
+    pd.testing.assert_frame_equal(ParsedFrameCache(str(tmp_path)).get('key'), df)
@@ -0,0 +1,61 @@
+import random
+import re
+import numpy as np
+import pandas as pd
+import pytest
+from data_processing import CLEAN_VALUES_LOOP_CELLS, clean_value, clean_values, normalize_dataframe
+from benchmarks.generators import make_statement_table
+
+# Every kind of cell clean_value handles, tricky ones included
+CELLS = [0, 7, -3, 2.5, -0.0, float('nan'), None, np.int64(12), np.float64(-1.5), True,
+         '', '  ', '0', '42', ' 1,234 ', '(1,234)', '($5.50)', '$1,000', '€ 12.5', '-7', '(-5)',
+         '--5', '5-', '1.2.3', '.5', '5.', '-', '.', 'abc', 'n/a', '1e3', 'nan', '12%', '(12)%']
+
+def _reference_failed(val):
+    # clean_value's own steps, reporting whether float() rejected a non-blank cell
+    if pd.isna(val) or isinstance(val, (int, float)) or not str(val).strip():
+        return False
+    text = str(val).strip().replace(',', '')
+    if '(' in text and ')' in text:
+        text = '-' + text.replace('(', '').replace(')', '')
+    try:
+        float(re.sub(r'[^\d.-]', '', text))
+        return False
+    except ValueError:
+        return True
+
+def _random_block(seed, n_rows, dtype):
+    rnd = random.Random(seed)
+    data = {col: [rnd.choice(CELLS) for _ in range(n_rows)] for col in ('2022', '2023', '2024')}
+    frame = pd.DataFrame(data, dtype=object)
+    if dtype in ('text', 'str'):
+        frame = frame.map(lambda v: v if isinstance(v, str) else None)
+    return frame.astype('str') if dtype == 'str' else frame
+
+@pytest.mark.parametrize('n_rows', [4, CLEAN_VALUES_LOOP_CELLS // 3 + 50])
+@pytest.mark.parametrize('dtype', ['mixed', 'text', 'str'])
+@pytest.mark.parametrize('seed', range(5))
+def test_clean_values_matches_clean_value(seed, dtype, n_rows):
+    block = _random_block(seed, n_rows, dtype)
+
+    values, failed = clean_values(block)
+
+    pd.testing.assert_frame_equal(values, block.map(clean_value).astype(float))
+    pd.testing.assert_frame_equal(failed, block.map(_reference_failed).astype(bool))
+
+def test_clean_values_numeric_and_series_blocks():
+    block = pd.DataFrame({'2023': [1, 2, None], '2024': [0.5, float('nan'), -3.0]})
+    values, failed = clean_values(block)
+    assert values.to_numpy().tolist() == [[1.0, 0.5], [2.0, 0.0], [0.0, -3.0]]
+    assert not failed.to_numpy().any()
+
+    values, failed = clean_values(pd.Series(['(1,000)', 'abc', ''], index=['a', 'b', 'c']))
+    assert values.to_dict() == {'a': -1000.0, 'b': 0.0, 'c': 0.0}
+    assert failed.to_dict() == {'a': False, 'b': True, 'c': False}
+
+def test_normalize_dataframe_reports_unparseable_years():
+    df = pd.DataFrame({'Line Item': ['Revenue', 'Net Income'], '2023': ['1,000', 'n/a'], '2024': ['(5)', '7']})
+    failures = {}
+    assert normalize_dataframe(df, failures) == {'revenue': {'2023': 1000.0, '2024': -5.0},
+                                                 'net_income': {'2023': 0.0, '2024': 7.0}}
+    assert failures == {'net_income': ['2023']}
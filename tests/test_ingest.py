@@ -0,0 +1,140 @@
+import io
+import random
+import pandas as pd
+import pytest
+import ingest
+from data_processing import FINANCIAL_MAPPING, clean_value, process_multiple_tables
+from ingest import read_csv_normalized, csv_columns, detect_company_column
+from benchmarks.generators import write_statement_xlsx
+from pdf_extractor import pool_context
+
+ALIASES = [alias for aliases in FINANCIAL_MAPPING.values() for alias in aliases]
+
+def _random_amount(rnd):
+    n = rnd.randint(-99_999, 999_999)
+    return rnd.choice([f"{n:,}", f"({abs(n):,})", str(n), f"{n:.3e}", f"{n / 1000}", "", f"${abs(n):,}"])
+
+def _random_export(seed, with_company=True, years=('2022', '2023', '2024')):
+    rnd = random.Random(seed)
+    companies = [f"C{i}" for i in range(rnd.randint(1, 8))]
+    rows = []
+    for _ in range(rnd.randint(1, 400)):
+        company = rnd.choice(companies) if rnd.random() > 0.02 else None
+        label = rnd.choice(ALIASES).title() if rnd.random() < 0.3 else rnd.choice(['Other', 'Goodwill', ''])
+        rows.append(([company] if with_company else []) + [label] + [_random_amount(rnd) for _ in years])
+    columns = (['Ticker'] if with_company else []) + ['Line Item', *years]
+    return pd.DataFrame(rows, columns=columns).to_csv(index=False).encode()
+
+def _cell_value(cell):
+    # Plain numbers (scientific notation included) as numbers, everything else as clean_value parses it
+    try:
+        return float(cell)
+    except (TypeError, ValueError):
+        return clean_value(cell)
+
+def _reference(data, company_col):
+    df = pd.read_csv(io.BytesIO(data), dtype=str)
+    year_cols = [c for c in df.columns if c not in (company_col, 'Line Item')]
+    df[year_cols] = df[year_cols].apply(lambda column: column.map(_cell_value))
+    if company_col is None:
+        frames = {None: process_multiple_tables([df])}
+    else:
+        frames = {company: process_multiple_tables([rows.drop(columns=[company_col]).reset_index(drop=True)])
+                  for company, rows in df.groupby(company_col, sort=False)}
+    return {company: frame for company, frame in frames.items() if not frame.empty}
+
+@pytest.mark.parametrize('engine, chunksize, block_bytes', [
+    ('pandas', 7, None), ('pandas', 1_000_000, None), ('pyarrow', None, 256), ('pyarrow', None, 16 * 2**20),
+])
+@pytest.mark.parametrize('seed', range(20))
+def test_read_csv_normalized_matches_whole_table_normalization(monkeypatch, seed, engine, chunksize, block_bytes):
+    data = _random_export(seed, with_company=seed % 5 != 0)
+    if block_bytes:
+        monkeypatch.setattr(ingest, 'CSV_BLOCK_BYTES', block_bytes)
+    company_col = detect_company_column(csv_columns(data))
+
+    frames = read_csv_normalized(io.BytesIO(data), company_col=company_col, engine=engine,
+                                 chunksize=chunksize or ingest.CSV_CHUNK_ROWS)
+
+    expected = _reference(data, company_col)
+    assert set(frames) == set(expected)
+    for company, frame in expected.items():
+        pd.testing.assert_frame_equal(frames[company], frame, check_index_type=False)
+
+@pytest.mark.parametrize('engine', ['pandas', 'pyarrow'])
+def test_scientific_notation_matches_read_csv(engine):
+    data = b"Ticker,Line Item,2023,2024\nA,Revenue,1.5e6,1e3\nA,Net Income,-2.5E-1,4\n"
+    frames = read_csv_normalized(data, company_col='Ticker', engine=engine)
+
+    old = process_multiple_tables([pd.read_csv(io.BytesIO(data)).drop(columns=['Ticker'])])
+    pd.testing.assert_frame_equal(frames['A'], old, check_index_type=False)
+    assert frames['A'].loc['2023', 'revenue'] == 1_500_000.0
+    assert frames['A'].loc['2024', 'revenue'] == 1000.0
+
+def _write_workbook(path, sheets):
+    from openpyxl import Workbook
+    workbook = Workbook()
+    workbook.remove(workbook.active)
+    for title, rows in sheets.items():
+        worksheet = workbook.create_sheet(title)
+        for row in rows:
+            worksheet.append(row)
+    workbook.save(path)
+    return path
+
+def test_amount_in_year_range_is_not_taken_for_a_header(tmp_path):
+    path = _write_workbook(tmp_path / 'book.xlsx', {'Balance': [
+        ['Line Item', 'Current', 'Prior'],
+        ['Revenue', 500, 400],
+        ['Net Income', 50, 40],
+        ['Total Assets', 2045, 1900],
+        ['Total Equity', 900, 800],
+    ]})
+    df = process_multiple_tables(ingest.load_tables(str(path), 'xlsx'))
+
+    old = process_multiple_tables([pd.read_excel(path)])
+    pd.testing.assert_frame_equal(df, old)
+    assert df.shape == (2, 4)
+
+def test_title_rows_above_year_header_are_skipped(tmp_path):
+    statement = [
+        ['Apple Inc.'],
+        ['Consolidated Statements of Operations (USD millions)'],
+        [None, 'Line item', 2024, 2023],
+        [None, 'Revenue', 1000, 900],
+        [None, 'Net Income', 100, 90],
+    ]
+    text_years = [['Balance sheet'], ['Line item', 'FY2024', 'FY2023'], ['Total Assets', 5000, 4000]]
+    cover = [[f"Basis of preparation, paragraph {i}"] for i in range(150)]
+    path = _write_workbook(tmp_path / 'book.xlsx', {'Cover': cover, 'Income': statement, 'Balance': text_years})
+
+    stats = {}
+    tables = ingest.read_excel_tables(str(path), stats=stats)
+
+    assert stats['sheets'] == 3 and stats['sheets_skipped'] == 1
+    assert [list(t.columns) for t in tables] == [['Line item', 2024, 2023], ['Line item', 'FY2024', 'FY2023']]
+    df = process_multiple_tables(tables[:1])
+    assert df.loc['2024', 'revenue'] == 1000 and df.loc['2023', 'net_income'] == 90
+
+def test_single_sheet_workbook_normalizes_as_read_excel(tmp_path):
+    from benchmarks.generators import write_statement_xlsx
+    path = write_statement_xlsx(str(tmp_path / 'statement.xlsx'), rows=20, years=3)
+    pd.testing.assert_frame_equal(process_multiple_tables(ingest.load_tables(path, 'xlsx')),
+                                  process_multiple_tables([pd.read_excel(path)]))
+
+def test_parallel_workbook_read_matches_serial_without_forking(tmp_path, monkeypatch):
+    path = write_statement_xlsx(str(tmp_path / 'book.xlsx'), rows=30, sheets=4, cover_rows=2)
+    contexts = []
+    def recording_context():
+        contexts.append(pool_context())
+        return contexts[-1]
+    monkeypatch.setattr(ingest, 'pool_context', recording_context)
+    monkeypatch.setattr(ingest, 'EXCEL_PARALLEL_MIN_ROWS', 0)
+
+    serial = ingest.read_excel_tables(path)
+    parallel = ingest.read_excel_tables(path, parallel=True, max_workers=2)
+
+    assert [c.get_start_method() for c in contexts] in (['forkserver'], ['spawn'])
+    assert len(parallel) == len(serial) == 4
+    for a, b in zip(parallel, serial):
+        pd.testing.assert_frame_equal(a, b)
@@ -0,0 +1,54 @@
+import warnings
+import pandas as pd
+import pytest
+from benchmarks.generators import write_statement_pdf
+from data_processing import process_multiple_tables
+from jobs import ExtractionJob
+from pdf_extractor import MIN_PAGES_FOR_PARALLEL, extract_layout_tables_from_pdf, extract_tables_from_pdf
+
+@pytest.fixture(autouse=True)
+def quiet_pdfminer():
+    # pdfminer warns about the hand-built synthetic PDFs
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore')
+        yield
+
+def _run(path, **options):
+    with open(path, 'rb') as f:
+        job = ExtractionJob(f.read(), **options).start()
+    job.join()
+    assert job.status == 'done', job.error
+    return job
+
+@pytest.mark.parametrize('ruled', [True, False])
+def test_job_folds_tables_as_process_multiple_tables(tmp_path, ruled):
+    path = write_statement_pdf(str(tmp_path / 'statement.pdf'), pages=6, tables_per_page=2, ruled=ruled)
+    extract = extract_tables_from_pdf if ruled else extract_layout_tables_from_pdf
+    tables = extract(path)
+
+    job = _run(path, layout_fallback=True, low_memory=True)
+
+    assert job.method == ('tables' if ruled else 'text layout')
+    assert job.tables_found == len(tables) > 0
+    expected = process_multiple_tables(tables)
+    pd.testing.assert_frame_equal(job.result(), expected)
+    assert job.line_items == list(job.master_data) and set(job.line_items) == set(expected.columns)
+    # The raw tables are merged as they arrive, never kept
+    assert not hasattr(job, 'tables')
+
+def test_parallel_job_starts_its_pool_from_the_job_thread(tmp_path):
+    pages = MIN_PAGES_FOR_PARALLEL + 4
+    path = write_statement_pdf(str(tmp_path / 'statement.pdf'), pages=pages, tables_per_page=2)
+    with open(path, 'rb') as f:
+        job = ExtractionJob(f.read(), parallel=True, max_workers=2, low_memory=True)
+    ticks = []
+    on_progress = job._on_progress
+    job._on_progress = lambda done, total: (ticks.append(done), on_progress(done, total))
+
+    job.start().join()
+
+    assert job.status == 'done', job.error
+    # Whole page ranges, not every page: the pool (forkserver/spawn) really ran
+    assert ticks[-1] == pages and len(ticks) < pages
+    expected = process_multiple_tables(extract_tables_from_pdf(path))
+    pd.testing.assert_frame_equal(job.result(), expected)
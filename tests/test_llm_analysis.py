@@ -0,0 +1,64 @@
+import io
+import re
+import numpy as np
+import pandas as pd
+from hypothesis import given, settings, strategies as st
+from llm_analysis import AMOUNT_RATIOS, format_compact_data_for_llm
+from ratio_analysis import calculate_ratios
+from utils import get_demo_data
+
+# Half a unit in the 4th significant digit
+REL_TOLERANCE = 5e-4
+
+def _parse_compact(summary):
+    """
+    Splits the compact payload back into (divisor, statement frame, ratios frame).
+    """
+    statement, ratios = summary.split('\n\n')
+    header, statement_csv = statement.split('\n', 1)
+    match = re.search(r'divided by ([\d,]+)', header)
+    divisor = float(match.group(1).replace(',', '')) if match else 1.0
+    ratios_csv = ratios.split('\n', 1)[1]
+    read = lambda text: pd.read_csv(io.StringIO(text), index_col=0, dtype={0: str}).T
+    return divisor, read(statement_csv), read(ratios_csv)
+
+def _assert_round_trips(parsed, original, scale):
+    for column in original.columns:
+        expected = original[column]
+        if expected.isna().all():
+            assert column not in parsed.columns
+            continue
+        got = parsed[column].reindex([str(y) for y in expected.index]).to_numpy(dtype=float) * scale(column)
+        expected = expected.to_numpy(dtype=float)
+        assert np.array_equal(np.isnan(got), np.isnan(expected)), column
+        present = ~np.isnan(expected)
+        np.testing.assert_allclose(got[present], expected[present], rtol=REL_TOLERANCE, atol=0, err_msg=column)
+
+def _check(df):
+    ratios = calculate_ratios(df)
+    summary = format_compact_data_for_llm(df, ratios, token_budget=10**9)
+    divisor, statement, parsed_ratios = _parse_compact(summary)
+
+    _assert_round_trips(statement, df, lambda column: divisor)
+    _assert_round_trips(parsed_ratios, ratios, lambda column: divisor if column in AMOUNT_RATIOS else 1)
+    return summary
+
+def test_demo_data_round_trips_and_states_its_scale():
+    summary = _check(get_demo_data())
+    # The demo filing is in millions; the payload must not claim a currency unit
+    assert summary.startswith("FINANCIAL STATEMENT DATA (thousands of reported units, "
+                              "i.e. the filing's figures divided by 1,000)")
+
+amounts = st.one_of(st.none(), st.floats(min_value=-1e13, max_value=1e13, allow_nan=False).filter(
+    lambda v: v == 0 or abs(v) > 1e-6))
+
+@settings(max_examples=200, deadline=None)
+@given(st.integers(min_value=1, max_value=6).flatmap(lambda n: st.lists(
+    st.lists(amounts, min_size=n, max_size=n), min_size=4, max_size=4).map(lambda cols: (n, cols))))
+def test_compact_payload_round_trips(case):
+    n_years, columns = case
+    names = ['revenue', 'net_income', 'total_assets', 'operating_cash_flow']
+    df = pd.DataFrame({name: pd.array(values, dtype='Float64').to_numpy(dtype=float, na_value=np.nan)
+                       for name, values in zip(names, columns)},
+                      index=[str(2020 + i) for i in range(n_years)])
+    _check(df)
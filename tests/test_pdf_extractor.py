@@ -0,0 +1,173 @@
+import tempfile
+import warnings
+import pandas as pd
+import pytest
+from benchmarks.generators import write_statement_pdf
+from data_processing import FINANCIAL_MAPPING, process_multiple_tables
+from pdf_extractor import (MIN_PAGES_FOR_PARALLEL, PdfText, extract_layout_tables_from_pdf, extract_pdf_text,
+                           extract_tables_from_pdf, iter_tables_from_pdf, layout_tables,
+                           simple_pdf_text_extraction)
+
+PAGES = MIN_PAGES_FOR_PARALLEL + 12
+
+@pytest.fixture(scope='module')
+def statement_pdf(tmp_path_factory):
+    path = tmp_path_factory.mktemp('pdf') / 'statement.pdf'
+    return str(write_statement_pdf(str(path), pages=PAGES, tables_per_page=2, rows=10))
+
+def _extract(source, **options):
+    ticks = []
+    with warnings.catch_warnings():
+        # pdfminer warns about the hand-built synthetic PDFs
+        warnings.simplefilter('ignore')
+        tables = list(iter_tables_from_pdf(source, progress=lambda done, total: ticks.append(done), **options))
+    return tables, ticks
+
+@pytest.mark.parametrize('as_bytes', [False, True])
+@pytest.mark.parametrize('prescreen', [False, True])
+def test_parallel_matches_serial(statement_pdf, as_bytes, prescreen):
+    source = statement_pdf
+    if as_bytes:
+        with open(statement_pdf, 'rb') as f:
+            source = f.read()
+
+    serial, serial_ticks = _extract(source, prescreen=prescreen)
+    parallel, parallel_ticks = _extract(source, prescreen=prescreen, parallel=True, max_workers=2)
+
+    # The serial path reports every page; the pool only whole ranges, so this also
+    # fails if the parallel run quietly fell back to the serial path
+    assert serial_ticks == list(range(PAGES + 1))
+    assert len(parallel_ticks) < len(serial_ticks) and parallel_ticks[-1] == PAGES
+
+    assert len({page_number for page_number, _ in serial}) >= PAGES // 2
+    pages = [page_number for page_number, _ in parallel]
+    assert pages == sorted(pages)
+    assert len(parallel) == len(serial)
+    for (serial_page, serial_df), (parallel_page, parallel_df) in zip(serial, parallel):
+        assert parallel_page == serial_page
+        pd.testing.assert_frame_equal(parallel_df, serial_df)
+
+def test_parallel_bytes_are_spilled_once_and_cleaned_up(statement_pdf, tmp_path, monkeypatch):
+    spill_dir = tmp_path / 'spill'
+    spill_dir.mkdir()
+    monkeypatch.setattr(tempfile, 'tempdir', str(spill_dir))
+    with open(statement_pdf, 'rb') as f:
+        data = f.read()
+
+    tables, ticks = _extract(data, parallel=True, max_workers=2)
+
+    assert len(ticks) < PAGES and tables
+    assert list(spill_dir.iterdir()) == []
+
+@pytest.fixture(scope='module')
+def text_pdf(tmp_path_factory):
+    """
+    (path, page texts as pdfplumber reads them) for a PDF alternating statement and prose pages.
+    """
+    import pdfplumber
+    path = str(write_statement_pdf(str(tmp_path_factory.mktemp('text') / 'filing.pdf'), pages=6, rows=12))
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore')
+        with pdfplumber.open(path) as pdf:
+            page_texts = [page.extract_text() or "" for page in pdf.pages]
+    return path, page_texts
+
+def _reference_positions(page_texts, aliases):
+    return [(page, line) for page, text in enumerate(page_texts, start=1)
+            for line, words in enumerate(text.lower().splitlines(), start=1)
+            if any(alias in words for alias in aliases)]
+
+def test_pdf_text_pages_round_trip(text_pdf):
+    path, page_texts = text_pdf
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore')
+        pdf_text = extract_pdf_text(path)
+        simple = simple_pdf_text_extraction(path)
+
+    assert pdf_text.n_pages == len(page_texts) == 6
+    # Pages are joined with a single newline
+    assert pdf_text.text == simple == '\n'.join(page_texts)
+    for page_number, expected in enumerate(page_texts, start=1):
+        assert pdf_text.page_text(page_number) == expected
+        start = pdf_text.page_offsets[page_number - 1]
+        assert pdf_text.text[start:start + len(expected)] == expected
+        assert pdf_text.page_at(start) == page_number
+        assert pdf_text.page_at(start + len(expected) - 1) == page_number
+
+def test_pdf_text_keyword_index(text_pdf):
+    path, page_texts = text_pdf
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore')
+        pdf_text = extract_pdf_text(path)
+
+    alias = _reference_positions(page_texts, ['operating cash flow'])
+    assert alias and pdf_text.positions('operating cash flow') == alias
+    assert pdf_text.pages(' Operating Cash Flow ') == list(dict.fromkeys(page for page, _ in alias))
+    # The standardized key covers every alias, each line once
+    key = _reference_positions(page_texts, FINANCIAL_MAPPING['operating_cash_flow'])
+    assert pdf_text.positions('operating_cash_flow') == key
+    # 'revenue' is both a key and one of its own aliases: no line is listed twice
+    revenue = pdf_text.positions('revenue')
+    assert revenue == _reference_positions(page_texts, FINANCIAL_MAPPING['revenue'])
+    assert len(revenue) == len(set(revenue))
+    assert pdf_text.positions('goodwill impairment') == [] and pdf_text.pages('nothing') == []
+
+def test_pdf_text_positions_are_page_and_line():
+    pdf_text = PdfText()
+    pdf_text.add_page("Cover page\nAnnual report")
+    pdf_text.add_page("Income statement\nTotal revenue 100 90\nNet income 10 9")
+    pdf_text.add_page("Cash flows\nNet cash from operating activities 12 11")
+
+    assert pdf_text.positions('revenue') == [(2, 2)]
+    assert pdf_text.positions('total revenue') == [(2, 2)]
+    assert pdf_text.positions('net_income') == [(2, 3)]
+    assert pdf_text.positions('operating_cash_flow') == [(3, 2)]
+    assert pdf_text.pages('operating_cash_flow') == [3]
+    assert pdf_text.page_text(2) == "Income statement\nTotal revenue 100 90\nNet income 10 9"
+    assert pdf_text.page_at(len("Cover page\nAnnual report")) == 1
+    assert pdf_text.page_at(len("Cover page\nAnnual report") + 1) == 2
+
+def _words(*lines):
+    """
+    Positioned words for layout_tables: each line is (top, [(text, x0), ...]), 6pt per character.
+    """
+    return [{'text': text, 'x0': x0, 'x1': x0 + 6 * len(text), 'top': top}
+            for top, words in lines for text, x0 in words]
+
+def test_layout_tables_reads_a_text_statement():
+    words = _words(
+        (90, [('Consolidated', 50), ('Statements', 130), ('of', 200), ('Operations', 220)]),
+        (110, [('Fiscal', 50), ('year', 90), ('2024', 300), ('2023', 400)]),
+        (130, [('Revenue', 50), ('$', 290), ('1,200', 298), ('$', 390), ('1,000', 398)]),
+        (150, [('Net', 50), ('loss', 75), ('(45)', 300), ('12', 406)]),
+        (170, [('Capital', 50), ('expenditure', 95), ('—', 309), ('(7)', 403)]),
+        (191, [('Total', 50), ('assets', 85), ('$2,500', 294), ('2,400', 398)]),
+    )
+
+    tables = layout_tables(words)
+
+    assert len(tables) == 1
+    expected = pd.DataFrame([['Revenue', '1,200', '1,000'], ['Net loss', '(45)', '12'],
+                             ['Capital expenditure', '—', '(7)'], ['Total assets', '$2,500', '2,400']],
+                            columns=['Line Item', '2024', '2023'])
+    pd.testing.assert_frame_equal(tables[0], expected)
+    df = process_multiple_tables(tables)
+    assert df.loc['2024'].to_dict() == {'revenue': 1200.0, 'net_income': -45.0, 'total_assets': 2500.0,
+                                        'capital_expenditure': 0.0}
+    assert df.loc['2023', 'capital_expenditure'] == -7.0
+
+def test_layout_parser_on_text_matches_table_detection_on_rules(tmp_path):
+    options = {'pages': 6, 'tables_per_page': 2, 'rows': 12, 'seed': 3}
+    ruled = write_statement_pdf(str(tmp_path / 'ruled.pdf'), ruled=True, **options)
+    text_only = write_statement_pdf(str(tmp_path / 'text.pdf'), ruled=False, **options)
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore')
+        detected = extract_tables_from_pdf(ruled)
+        # Table detection needs the rules; the layout parser doesn't
+        assert extract_tables_from_pdf(text_only) == []
+        laid_out = extract_layout_tables_from_pdf(text_only)
+
+    assert len(laid_out) == len(detected) > 0
+    expected = process_multiple_tables(detected)
+    assert expected.notna().sum().sum() > 0
+    pd.testing.assert_frame_equal(process_multiple_tables(laid_out), expected)
@@ -0,0 +1,205 @@
+from unittest.mock import patch
+import pandas as pd
+import pytest
+from hypothesis import given, settings, strategies as st
+from ratio_analysis import (RATIO_REGISTRY, _lookback, calculate_panel_ratios, calculate_ratios, register_ratio,
+                            update_ratios)
+from utils import get_demo_data
+
+LINE_ITEMS = ['revenue', 'net_income', 'operating_income', 'total_liabilities', 'equity',
+              'current_assets', 'current_liabilities', 'operating_cash_flow',
+              'capital_expenditure', 'total_debt']
+YEARS = [str(year) for year in range(2010, 2025)]
+
+amounts = st.one_of(st.none(), st.just(0.0),
+                    st.floats(min_value=-1e12, max_value=1e12, allow_nan=False))
+
+@st.composite
+def statements(draw, years, columns):
+    """
+    A normalized frame (years as index, line items as columns) with NaNs and zeros mixed in.
+    """
+    data = {column: [draw(amounts) for _ in years] for column in columns}
+    return pd.DataFrame(data, index=pd.Index(years), dtype=float)
+
+@st.composite
+def updates(draw):
+    """
+    (prev_df, new_df, ratios): new_df appends periods, restates old ones or both, and may
+    bring line items prev_df didn't have.
+    """
+    prev_years = sorted(draw(st.sets(st.sampled_from(YEARS), min_size=1, max_size=8)))
+    prev_columns = draw(st.lists(st.sampled_from(LINE_ITEMS), min_size=1, unique=True))
+    prev_df = draw(statements(prev_years, prev_columns))
+
+    restated = draw(st.sets(st.sampled_from(prev_years)))
+    appended = draw(st.sets(st.sampled_from(YEARS)))
+    new_years = sorted(restated | appended)
+    new_columns = prev_columns
+    if draw(st.booleans()):
+        new_columns = draw(st.lists(st.sampled_from(LINE_ITEMS), min_size=1, unique=True))
+    new_df = draw(statements(new_years, new_columns))
+
+    ratios = None
+    if draw(st.booleans()):
+        ratios = draw(st.lists(st.sampled_from(list(RATIO_REGISTRY)), unique=True))
+    return prev_df, new_df, ratios
+
+def _scratch_registry():
+    # Ratios registered inside are dropped again on exit
+    return patch.dict(RATIO_REGISTRY)
+
+def _register_growth_change(lookback):
+    # A ratio on a ratio that itself looks back: two periods of history in all
+    register_ratio('Growth Change (pp)', ['Revenue Growth (%)'],
+                   lambda v, prev: v['Revenue Growth (%)'] - prev(v['Revenue Growth (%)']),
+                   lookback=lookback)
+
+def _check_update(prev_df, new_df, ratios):
+    prev_ratios = calculate_ratios(prev_df, ratios)
+
+    df, updated = update_ratios(prev_df, prev_ratios, new_df, ratios)
+
+    merged = new_df.combine_first(prev_df).sort_index()
+    pd.testing.assert_frame_equal(df, merged)
+    pd.testing.assert_frame_equal(updated, calculate_ratios(merged, ratios))
+
+@settings(max_examples=500, deadline=None)
+@given(updates())
+def test_update_ratios_matches_full_recompute(case):
+    _check_update(*case)
+
+@st.composite
+def panels(draw):
+    """
+    ({company: frame}, columns): companies with their own sets of years over the same line items.
+    """
+    columns = draw(st.lists(st.sampled_from(LINE_ITEMS), min_size=1, unique=True))
+    companies = draw(st.lists(st.text('ABCXYZ', min_size=1, max_size=3), min_size=1, max_size=6, unique=True))
+    frames = {}
+    for company in companies:
+        years = sorted(draw(st.sets(st.sampled_from(YEARS), min_size=1, max_size=8)))
+        frames[company] = draw(statements(years, columns))
+    return frames
+
+@settings(max_examples=300, deadline=None)
+@given(frames=panels(), data=st.data())
+def test_panel_ratios_match_each_company(frames, data):
+    panel = pd.concat(frames)
+    # Rows (and so companies and years) in any order
+    order = data.draw(st.permutations(range(len(panel))))
+    panel = panel.iloc[list(order)]
+
+    ratios = calculate_panel_ratios(panel)
+
+    assert ratios.index.is_monotonic_increasing
+    for company, frame in frames.items():
+        pd.testing.assert_frame_equal(ratios.loc[company], calculate_ratios(frame))
+
+@pytest.mark.parametrize('lookback', [None, 1])
+def test_update_ratios_follows_lookback_through_ratios(lookback):
+    prev_df = pd.DataFrame({'revenue': [100.0, 120.0, 150.0]}, index=['2021', '2022', '2023'])
+    new_df = pd.DataFrame({'revenue': [172.5]}, index=['2024'])
+    with _scratch_registry():
+        _register_growth_change(lookback)
+
+        _, ratios = update_ratios(prev_df, calculate_ratios(prev_df), new_df)
+
+        # 2024 grew 15%, 2023 25%
+        assert ratios.loc['2024', 'Growth Change (pp)'] == pytest.approx(-10.0)
+        assert _lookback(['Growth Change (pp)']) == (None if lookback is None else 2)
+
+@pytest.mark.parametrize('lookback', [None, 1])
+@settings(max_examples=100, deadline=None)
+@given(case=updates())
+def test_update_ratios_with_ratio_on_ratio_matches_full_recompute(lookback, case):
+    prev_df, new_df, ratios = case
+    with _scratch_registry():
+        _register_growth_change(lookback)
+        _check_update(prev_df, new_df, None if ratios is None else ratios + ['Growth Change (pp)'])
+
+def test_update_ratios_appends_a_year():
+    prev_df = pd.DataFrame({'revenue': [100.0, 110.0], 'net_income': [10.0, 12.0]},
+                           index=['2022', '2023'])
+    new_df = pd.DataFrame({'revenue': [121.0], 'net_income': [11.0]}, index=['2024'])
+
+    df, ratios = update_ratios(prev_df, calculate_ratios(prev_df), new_df)
+
+    assert list(df.index) == ['2022', '2023', '2024']
+    assert ratios.loc['2024', 'Revenue Growth (%)'] == (121.0 / 110.0 - 1) * 100
+    assert ratios.loc['2024', 'Net Profit Margin'] == 11.0 / 121.0 * 100
+
+def _legacy_runway(df):
+    # The row-wise version the registry's vectorized formula replaced
+    def calc_runway(row):
+        if row['operating_cash_flow'] < 0:
+            burn_rate = abs(row['operating_cash_flow']) / 12
+            return row['current_assets'] / burn_rate if burn_rate > 0 else float('inf')
+        return float('nan')
+    return df.apply(calc_runway, axis=1)
+
+def test_cash_runway_matches_row_wise_version():
+    demo = get_demo_data()
+    burning = pd.DataFrame({'operating_cash_flow': [-1200.0, -1.0, -500.0, float('nan'), 0.0],
+                            'current_assets': [6000.0, 10.0, float('nan'), 100.0, 100.0]},
+                           index=['2024', '2025', '2026', '2027', '2028'])
+    df = pd.concat([demo, burning])
+
+    runway = calculate_ratios(df, ['Cash Runway (Months)'])['Cash Runway (Months)']
+
+    pd.testing.assert_series_equal(runway, _legacy_runway(df), check_names=False)
+    assert runway.loc['2024'] == 60.0 and runway.loc[['2021', '2022', '2023']].isna().all()
+
+def test_subset_request_pulls_in_dependencies_but_returns_only_what_was_asked():
+    df = get_demo_data()
+    with _scratch_registry():
+        register_ratio('Margin Spread (pp)', ['Operating Margin', 'Net Profit Margin'],
+                       lambda v, prev: v['Operating Margin'] - v['Net Profit Margin'], lookback=0)
+
+        ratios = calculate_ratios(df, ['Margin Spread (pp)', 'ROE (%)'])
+
+    assert list(ratios.columns) == ['Margin Spread (pp)', 'ROE (%)']
+    full = calculate_ratios(df)
+    pd.testing.assert_series_equal(ratios['Margin Spread (pp)'],
+                                   full['Operating Margin'] - full['Net Profit Margin'], check_names=False)
+    pd.testing.assert_series_equal(ratios['ROE (%)'], full['ROE (%)'])
+
+def test_missing_inputs_leave_a_ratio_out():
+    df = pd.DataFrame({'revenue': [100.0, 110.0]}, index=['2023', '2024'])
+    assert list(calculate_ratios(df).columns) == ['Revenue Growth (%)']
+    assert calculate_ratios(df, ['Net Profit Margin', 'No Such Ratio']).empty
+
+def test_liabilities_to_equity_is_only_a_fallback():
+    df = pd.DataFrame({'total_liabilities': [300.0], 'equity': [150.0]}, index=['2024'])
+    assert calculate_ratios(df)['Liabilities-to-Equity'].tolist() == [2.0]
+    assert 'Debt-to-Equity' not in calculate_ratios(df)
+
+    df['total_debt'] = [75.0]
+    ratios = calculate_ratios(df)
+    assert ratios['Debt-to-Equity'].tolist() == [0.5]
+    assert 'Liabilities-to-Equity' not in ratios
+    # Asking for the fallback by name doesn't override the rule
+    assert calculate_ratios(df, ['Liabilities-to-Equity']).empty
+
+def test_dependency_cycle_raises():
+    df = pd.DataFrame({'revenue': [100.0]}, index=['2024'])
+    with _scratch_registry():
+        register_ratio('A', ['B'], lambda v, prev: v['B'], lookback=0)
+        register_ratio('B', ['revenue', 'A'], lambda v, prev: v['A'], lookback=0)
+        with pytest.raises(ValueError, match="Circular ratio dependency: A -> B -> A"):
+            calculate_ratios(df, ['A'])
+
+def test_custom_ratio_registered_from_outside():
+    df = get_demo_data()
+    with _scratch_registry():
+        register_ratio('Capex Intensity (%)', ['capital_expenditure', 'revenue'],
+                       lambda v, prev: v['capital_expenditure'].abs() / v['revenue'] * 100)
+
+        ratios = calculate_ratios(df)
+        panel = calculate_panel_ratios(pd.concat({'AAPL': df, 'COPY': df}))
+
+    expected = df['capital_expenditure'].abs() / df['revenue'] * 100
+    assert list(ratios.columns)[-1] == 'Capex Intensity (%)'
+    pd.testing.assert_series_equal(ratios['Capex Intensity (%)'], expected, check_names=False)
+    pd.testing.assert_series_equal(panel.loc['COPY', 'Capex Intensity (%)'], expected, check_names=False)
+    assert 'Capex Intensity (%)' not in RATIO_REGISTRY